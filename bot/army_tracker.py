@@ -0,0 +1,149 @@
+from collections import Counter
+
+from sc2.ids.unit_typeid import UnitTypeId
+
+from bot.unit_costs import DEFAULT_UNIT_COST
+
+# Supply counted towards HanBot's military supply
+MILITARY_SUPPLY = {
+    UnitTypeId.MARINE: 1,
+    UnitTypeId.MARAUDER: 2,
+    UnitTypeId.REAPER: 1,
+    UnitTypeId.SIEGETANK: 4,  # Siege Tank costs 3 supply
+    UnitTypeId.SIEGETANKSIEGED: 4,  # Include sieged tanks
+}
+
+# Units that never count towards army value
+NON_COMBAT_TYPES = {
+    UnitTypeId.SCV,
+    UnitTypeId.PROBE,
+    UnitTypeId.DRONE,
+    UnitTypeId.MULE,
+    UnitTypeId.LARVA,
+    UnitTypeId.EGG,
+}
+
+class ArmyTracker:
+    """
+    Per-type unit counts, military supply and army value for both sides, kept up to
+    date from unit events so that production and attack heuristics read counters
+    instead of re-filtering `self.units` every frame.
+
+    Own structures are only counted once they are complete, matching
+    `self.structures(type).ready`. Enemy counts cover every enemy unit seen and not
+    yet destroyed, including ones currently out of vision.
+    """
+
+    def __init__(self, cost_table):
+        self.cost_table = cost_table
+        self.own_counts = Counter()
+        self.enemy_counts = Counter()
+        self.pending_counts = {}  # type -> already_pending this step, filled on first read
+        self._already_pending = None
+        self.military_supply = 0
+        self.own_army_value = 0
+        self.enemy_army_value = 0
+        self._own_types = {}  # tag -> type of own units and completed structures
+        self._own_structures_in_progress = {}  # tag -> type of own structures under construction
+        self._enemy_types = {}  # tag -> type of known enemy units and structures
+
+    def _value(self, type_id, is_structure):
+        if is_structure or type_id in NON_COMBAT_TYPES:
+            return 0
+        if type_id.value >= len(self.cost_table):
+            return sum(DEFAULT_UNIT_COST)
+        return int(self.cost_table[type_id.value].sum())
+
+    def _add_own(self, tag, type_id, is_structure):
+        self._own_types[tag] = (type_id, is_structure)
+        self.own_counts[type_id] += 1
+        self.military_supply += MILITARY_SUPPLY.get(type_id, 0)
+        self.own_army_value += self._value(type_id, is_structure)
+
+    def _remove_own(self, tag):
+        type_id, is_structure = self._own_types.pop(tag)
+        self.own_counts[type_id] -= 1
+        self.military_supply -= MILITARY_SUPPLY.get(type_id, 0)
+        self.own_army_value -= self._value(type_id, is_structure)
+
+    def _add_enemy(self, tag, type_id, is_structure):
+        self._enemy_types[tag] = (type_id, is_structure)
+        self.enemy_counts[type_id] += 1
+        self.enemy_army_value += self._value(type_id, is_structure)
+
+    def _remove_enemy(self, tag):
+        type_id, is_structure = self._enemy_types.pop(tag)
+        self.enemy_counts[type_id] -= 1
+        self.enemy_army_value -= self._value(type_id, is_structure)
+
+    def seed(self, units, structures, enemies):
+        """Register everything present at game start; events only report later changes."""
+        for unit in units:
+            self.unit_created(unit)
+        for structure in structures:
+            if structure.is_ready:
+                self.structure_completed(structure)
+            else:
+                self.structure_started(structure)
+        for enemy in enemies:
+            self.enemy_seen(enemy)
+
+    def unit_created(self, unit):
+        if unit.tag not in self._own_types:
+            self._add_own(unit.tag, unit.type_id, False)
+
+    def structure_started(self, structure):
+        self._own_structures_in_progress[structure.tag] = structure.type_id
+
+    def structure_completed(self, structure):
+        self._own_structures_in_progress.pop(structure.tag, None)
+        if structure.tag not in self._own_types:
+            self._add_own(structure.tag, structure.type_id, True)
+
+    def type_changed(self, unit, previous_type):
+        """Move an own unit or completed structure from its previous type to its current one."""
+        if unit.tag in self._own_types:
+            _, is_structure = self._own_types[unit.tag]
+            self._remove_own(unit.tag)
+            self._add_own(unit.tag, unit.type_id, is_structure)
+
+    def enemy_seen(self, unit):
+        """Register an enemy entering vision, updating its type if it morphed while out of sight."""
+        tracked = self._enemy_types.get(unit.tag)
+        if tracked is not None and tracked[0] == unit.type_id:
+            return
+        if tracked is not None:
+            self._remove_enemy(unit.tag)
+        self._add_enemy(unit.tag, unit.type_id, unit.is_structure)
+
+    def unit_destroyed(self, tag):
+        if tag in self._own_types:
+            self._remove_own(tag)
+        elif tag in self._enemy_types:
+            self._remove_enemy(tag)
+        self._own_structures_in_progress.pop(tag, None)
+
+    def refresh_pending(self, already_pending):
+        """
+        Start a new step for pending counts, each type is looked up once on its first read.
+
+        Args:
+            already_pending: BotAI.already_pending, which python-sc2 caches per frame
+        """
+        self._already_pending = already_pending
+        self.pending_counts.clear()
+
+    def count(self, type_id):
+        """Own units or completed structures of a type."""
+        return self.own_counts[type_id]
+
+    def enemy_count(self, type_id):
+        return self.enemy_counts[type_id]
+
+    def pending(self, type_id):
+        """Own units or structures of a type in production."""
+        if self._already_pending is None:
+            raise RuntimeError("refresh_pending must be called before pending counts are read")
+        if type_id not in self.pending_counts:
+            self.pending_counts[type_id] = self._already_pending(type_id)
+        return self.pending_counts[type_id]
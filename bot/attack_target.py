@@ -0,0 +1,89 @@
+from typing import Optional
+
+import numpy as np
+from sc2.position import Point2
+
+# Before this game time, with no enemy structure seen, the enemy spawn is the target
+SCOUTED_SPAWN_UNTIL: float = 240.0
+
+
+class AttackTargetCache:
+    """
+    Attack target for the ares bots, recomputed only when it can have changed.
+
+    The target is the known enemy structure closest to our start location. With no
+    structure known, it is the enemy spawn early on and afterwards the expansion
+    locations in turn, moving on whenever the current one is visible. The ranking
+    of all candidate targets is only redone when the set of known enemy structure
+    tags changes or the current expansion target becomes visible, and at most once
+    per game loop, so `target` and `ranked` can be read freely by every subsystem.
+    """
+
+    def __init__(self):
+        self._start: Point2 = Point2((0.0, 0.0))
+        self._enemy_spawn: Point2 = Point2((0.0, 0.0))
+        self._expansions: list[Point2] = []
+        self._expansion_index: int = 0
+        self._structure_tags: Optional[set[int]] = None
+        self._game_loop: int = -1
+        self._ranked: list[Point2] = []
+        self._searching: bool = False  # Whether _ranked holds the expansion search order
+
+    def reset(self, start: Point2, enemy_spawn: Point2, expansions: list[Point2]) -> None:
+        """Call from on_start."""
+        self._start = start
+        self._enemy_spawn = enemy_spawn
+        self._expansions = list(expansions) or [enemy_spawn]
+        self._expansion_index = -1  # The first search target is the enemy spawn
+        self._structure_tags = None
+        self._game_loop = -1
+        self._ranked = []
+        self._searching = False
+
+    def _expansion_target(self) -> Point2:
+        if self._expansion_index < 0:
+            return self._enemy_spawn
+        return self._expansions[self._expansion_index]
+
+    def _rank_expansions(self) -> list[Point2]:
+        start = self._expansion_index
+        order = self._expansions[max(start, 0) :] + self._expansions[: max(start, 0)]
+        return [self._enemy_spawn] + order if start < 0 else order
+
+    def _refresh(self, ai) -> None:
+        if ai.state.game_loop == self._game_loop:
+            return
+        self._game_loop = ai.state.game_loop
+
+        structures = ai.enemy_structures
+        if structures:
+            tags = structures.tags
+            if tags != self._structure_tags:
+                self._structure_tags = tags
+                positions = np.array([s.position_tuple for s in structures])
+                distances = np.hypot(positions[:, 0] - self._start[0], positions[:, 1] - self._start[1])
+                self._ranked = [structures[i].position for i in np.argsort(distances, kind="stable")]
+            self._searching = False
+            return
+
+        self._structure_tags = None
+        if ai.time < SCOUTED_SPAWN_UNTIL:
+            self._ranked = [self._enemy_spawn]
+            self._searching = False
+            return
+        # search the map: cycle through expansion locations
+        if not self._searching or ai.is_visible(self._expansion_target()):
+            if self._searching:
+                self._expansion_index = (self._expansion_index + 1) % len(self._expansions)
+            self._searching = True
+            self._ranked = self._rank_expansions()
+
+    def target(self, ai) -> Point2:
+        """The current attack target."""
+        self._refresh(ai)
+        return self._ranked[0]
+
+    def ranked(self, ai) -> list[Point2]:
+        """Candidate attack targets, best first."""
+        self._refresh(ai)
+        return self._ranked
@@ -0,0 +1,156 @@
+"""
+Synthetic battle fixtures for benchmarking combat code.
+
+Armies of configurable size, composition and spread are written as raw units into a
+copy of a recorded observation, so the bot sees them through the normal
+`_prepare_step` / `issue_events` path of the step-replay harness.
+"""
+import numpy as np
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2.data import Race
+from sc2.ids.unit_typeid import UnitTypeId
+
+# Army share per unit type for each race
+DEFAULT_COMPOSITIONS = {
+    Race.Terran: {
+        UnitTypeId.MARINE: 0.6,
+        UnitTypeId.MARAUDER: 0.25,
+        UnitTypeId.SIEGETANK: 0.1,
+        UnitTypeId.MEDIVAC: 0.05,
+    },
+    Race.Zerg: {
+        UnitTypeId.ZERGLING: 0.4,
+        UnitTypeId.ROACH: 0.4,
+        UnitTypeId.HYDRALISK: 0.2,
+    },
+    Race.Protoss: {
+        UnitTypeId.ZEALOT: 0.3,
+        UnitTypeId.STALKER: 0.5,
+        UnitTypeId.IMMORTAL: 0.2,
+    },
+}
+
+# Unit types generated as air units
+FLYING_TYPES = {
+    UnitTypeId.MEDIVAC,
+    UnitTypeId.RAVEN,
+    UnitTypeId.VIKINGFIGHTER,
+    UnitTypeId.BANSHEE,
+    UnitTypeId.MUTALISK,
+    UnitTypeId.CORRUPTOR,
+    UnitTypeId.OVERLORD,
+    UnitTypeId.PHOENIX,
+    UnitTypeId.VOIDRAY,
+    UnitTypeId.OBSERVER,
+}
+
+UNIT_HEALTH = 100.0  # Health given to every generated unit
+ALLIANCE_SELF = 1
+ALLIANCE_ENEMY = 4
+DISPLAY_VISIBLE = 1
+
+
+def composition_counts(composition, count):
+    """
+    Split `count` units over a composition by largest remainder.
+
+    Args:
+        composition: dict of UnitTypeId -> share (shares need not sum to 1)
+        count: Total number of units
+
+    Returns:
+        list of (UnitTypeId, number of units)
+    """
+    types = list(composition)
+    shares = np.array([composition[t] for t in types], dtype=float)
+    exact = shares / shares.sum() * count
+    counts = np.floor(exact).astype(int)
+    for i in np.argsort(counts - exact)[: count - counts.sum()]:
+        counts[i] += 1
+    return [(t, int(n)) for t, n in zip(types, counts) if n]
+
+
+def add_army(raw_data, composition, count, center, spread, owner, alliance, first_tag, rng, bounds):
+    """
+    Append `count` raw units scattered around `center` to an observation's raw data.
+
+    Args:
+        raw_data: ObservationRaw proto to extend
+        composition: dict of UnitTypeId -> share
+        count: Number of units
+        center: (x, y) of the army
+        spread: Standard deviation of unit positions around `center`
+        owner: Player id owning the units
+        alliance: ALLIANCE_SELF or ALLIANCE_ENEMY
+        first_tag: Tag of the first generated unit
+        rng: np.random.Generator
+        bounds: (x0, y0, x1, y1) playable area positions are clipped to
+
+    Returns:
+        Next unused tag
+    """
+    tag = first_tag
+    for type_id, amount in composition_counts(composition, count):
+        positions = rng.normal(center, spread, size=(amount, 2))
+        positions[:, 0] = positions[:, 0].clip(bounds[0], bounds[2])
+        positions[:, 1] = positions[:, 1].clip(bounds[1], bounds[3])
+        for x, y in positions:
+            unit = raw_data.units.add()
+            unit.tag = tag
+            unit.unit_type = type_id.value
+            unit.owner = owner
+            unit.alliance = alliance
+            unit.display_type = DISPLAY_VISIBLE
+            unit.pos.x = x
+            unit.pos.y = y
+            unit.facing = rng.uniform(0, 2 * np.pi)
+            unit.radius = 0.5
+            unit.build_progress = 1.0
+            unit.health = unit.health_max = UNIT_HEALTH
+            unit.is_flying = type_id in FLYING_TYPES
+            tag += 1
+    return tag
+
+
+def battle_observation(
+    base_observation,
+    own_composition,
+    enemy_composition,
+    army_size,
+    own_center,
+    enemy_center,
+    player_id,
+    bounds,
+    spread=6.0,
+    seed=0,
+):
+    """
+    Copy of a recorded observation with an own and an enemy army added.
+
+    Args:
+        base_observation: ResponseObservation to start from (left unchanged)
+        own_composition: dict of UnitTypeId -> share for the bot's army
+        enemy_composition: dict of UnitTypeId -> share for the enemy army
+        army_size: Units per side
+        own_center: (x, y) of the bot's army
+        enemy_center: (x, y) of the enemy army
+        player_id: The bot's player id
+        bounds: (x0, y0, x1, y1) playable area
+        spread: Standard deviation of unit positions around each center
+        seed: Seed for unit positions, the same seed always gives the same fixture
+
+    Returns:
+        sc_pb.ResponseObservation
+    """
+    observation = sc_pb.ResponseObservation()
+    observation.CopyFrom(base_observation)
+    raw_data = observation.observation.raw_data
+    rng = np.random.default_rng(seed)
+    first_tag = max((unit.tag for unit in raw_data.units), default=0) + 1
+    first_tag = add_army(
+        raw_data, own_composition, army_size, own_center, spread, player_id, ALLIANCE_SELF, first_tag, rng, bounds
+    )
+    add_army(
+        raw_data, enemy_composition, army_size, enemy_center, spread, 3 - player_id, ALLIANCE_ENEMY, first_tag, rng, bounds
+    )
+    return observation
@@ -0,0 +1,134 @@
+from collections import deque
+
+import numpy as np
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.position import Point2
+from sc2.unit import Unit
+
+# Orders that are finished once an idle unit stands at their target point
+ARRIVAL_ABILITIES = {AbilityId.MOVE, AbilityId.MOVE_MOVE, AbilityId.ATTACK, AbilityId.ATTACK_ATTACK}
+
+# Morphs that do nothing when the unit already has the resulting type
+MORPH_RESULTS = {
+    AbilityId.MORPH_SUPPLYDEPOT_LOWER: UnitTypeId.SUPPLYDEPOTLOWERED,
+    AbilityId.MORPH_SUPPLYDEPOT_RAISE: UnitTypeId.SUPPLYDEPOT,
+}
+
+RECENT_STEPS = 224  # Per-step counts kept for the summary, about 20 seconds at GameStep 2
+
+
+class CommandFilter:
+    """
+    Drops commands that would not change what a unit is doing before they are sent.
+
+    python-sc2's `prevent_double_actions` already skips a command whose ability and
+    target exactly match the unit's current order. This filter runs before it and also
+    catches what the bot re-issues every step with slightly different coordinates:
+
+    - the current order has the same ability and a target within `tolerance`
+    - an idle unit is told to move or attack-move to where it already stands
+    - the same command is given to the same unit more than once in a step, the last
+      copy is kept so the unit still ends on the order it was given last
+    - a supply depot is lowered or raised when it already is
+
+    Only a unit's last non-queued command is checked against its current order, and
+    only when it is the unit's first command of the step: after any earlier command
+    it is what puts the unit back on that order. Queued commands and commands without
+    a target (training, research) always pass, apart from the depot morphs.
+    """
+
+    def __init__(self, tolerance=1.0):
+        """
+        Args:
+            tolerance: Distance below which two target points count as the same
+        """
+        self.tolerance = tolerance
+        self.sent = 0  # Commands kept in the most recent step
+        self.suppressed = 0  # Commands dropped in the most recent step
+        self.recent = deque(maxlen=RECENT_STEPS)  # (sent, suppressed) of the last steps
+        self.total_sent = 0
+        self.total_suppressed = 0
+
+    def _same_target(self, target, order_target):
+        if isinstance(target, Unit):
+            return order_target == target.tag
+        if isinstance(target, Point2) and isinstance(order_target, Point2):
+            return target.distance_to_point2(order_target) <= self.tolerance
+        return False
+
+    def is_redundant(self, command):
+        """Whether `command` would leave the unit doing what it already does."""
+        unit = command.unit
+        if command.ability in MORPH_RESULTS:
+            return unit.type_id == MORPH_RESULTS[command.ability]
+        if command.queue or command.target is None:
+            return False
+        if not unit.orders:
+            return (
+                command.ability in ARRIVAL_ABILITIES
+                and isinstance(command.target, Point2)
+                and unit.distance_to(command.target) <= self.tolerance
+            )
+        current = unit.orders[0]
+        if command.ability not in {current.ability.id, current.ability.exact_id}:
+            return False
+        return self._same_target(command.target, current.target)
+
+    def filter(self, commands):
+        """
+        Remove redundant commands and update the sent/suppressed counts.
+
+        Args:
+            commands: list of UnitCommand issued this step
+
+        Returns:
+            list of the commands worth sending, in their original order
+        """
+        unique = []
+        seen = set()
+        # Newest first, so of repeated commands the last one issued is the one kept
+        for command in reversed(commands):
+            if command.target is not None:
+                target = command.target.tag if isinstance(command.target, Unit) else command.target
+                key = (command.unit.tag, command.ability, target, command.queue)
+                if key in seen:
+                    continue
+                seen.add(key)
+            unique.append(command)
+        unique.reverse()
+
+        # Index of each unit's first command and of its last non-queued one
+        first = {}
+        last_replacing = {}
+        for index, command in enumerate(unique):
+            first.setdefault(command.unit.tag, index)
+            if not command.queue:
+                last_replacing[command.unit.tag] = index
+        kept = [
+            command
+            for index, command in enumerate(unique)
+            if not (
+                first[command.unit.tag] == index == last_replacing.get(command.unit.tag)
+                and self.is_redundant(command)
+            )
+        ]
+
+        self.sent = len(kept)
+        self.suppressed = len(commands) - len(kept)
+        self.recent.append((self.sent, self.suppressed))
+        self.total_sent += self.sent
+        self.total_suppressed += self.suppressed
+        return kept
+
+    def summary(self):
+        total = self.total_sent + self.total_suppressed
+        share = 100.0 * self.total_suppressed / total if total else 0.0
+        lines = [f"commands sent {self.total_sent}, suppressed {self.total_suppressed} ({share:.1f}%)"]
+        if self.recent:
+            sent, suppressed = np.array(self.recent).T
+            lines.append(
+                f"  per step over the last {len(self.recent)}: sent mean {sent.mean():.1f} max {sent.max()}, "
+                f"suppressed mean {suppressed.mean():.1f} max {suppressed.max()}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,56 @@
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.unit import Unit
+from sc2.units import Units
+
+IGNORED = 0  # Memory units and ignored types
+STRUCTURE = 1
+UNIT = 2
+
+
+class EnemyClassifier:
+    """
+    Classifies each enemy once per step, keyed by tag, for `_micro`.
+
+    `_micro` needs, for every unit in its forces, the nearby enemies that are worth
+    fighting and the subset of those that are not structures. Nearby groups overlap
+    heavily, so instead of running two `Units.filter` lambdas per army unit, each enemy
+    is classified the first time it is seen this step and every nearby group is then
+    split in a single pass of dict lookups.
+
+    Create a new classifier every step, a unit's memory state changes between steps.
+    """
+
+    def __init__(self, ignore_types: set[UnitTypeId], structure_types: set[UnitTypeId]):
+        self.ignore_types = ignore_types
+        self.structure_types = structure_types
+        self.classes: dict[int, int] = {}
+
+    def classify(self, unit: Unit) -> int:
+        cls = self.classes.get(unit.tag)
+        if cls is None:
+            if unit.is_memory or unit.type_id in self.ignore_types:
+                cls = IGNORED
+            elif unit.type_id in self.structure_types:
+                cls = STRUCTURE
+            else:
+                cls = UNIT
+            self.classes[unit.tag] = cls
+        return cls
+
+    def split(self, nearby: Units) -> tuple[Units, Units]:
+        """
+        Split a group of nearby enemies.
+
+        Returns:
+            Tuple of (enemies worth fighting, the ones among them that are not structures)
+        """
+        all_close = []
+        only_enemy_units = []
+        for unit in nearby:
+            cls = self.classify(unit)
+            if cls != IGNORED:
+                all_close.append(unit)
+                if cls == UNIT:
+                    only_enemy_units.append(unit)
+        bot_object = nearby._bot_object
+        return Units(all_close, bot_object), Units(only_enemy_units, bot_object)
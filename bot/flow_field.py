@@ -0,0 +1,322 @@
+import math
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from sc2.position import Point2
+
+from bot.grid_tracker import GridTracker
+
+# (dx, dy) of the 8 neighbours of a grid cell
+NEIGHBOUR_OFFSETS: list[tuple[int, int]] = [
+    (dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)
+]
+# Cells a unit's waypoint lies ahead of it along the field
+WAYPOINT_LOOKAHEAD: int = 8
+# Units further than this from their route re-plan
+OFF_ROUTE_DISTANCE: float = 3.0
+# Units closer than this to the target attack-move instead of following the field
+FLOW_FIELD_ARRIVAL_DISTANCE: float = 6.0
+# Game loops a field is kept after the costs of its grid changed before it may be rebuilt;
+# a change of which cells are passable rebuilds it right away
+FLOW_FIELD_MAX_AGE: int = 32
+# Cells around a target (or a unit) searched first for the nearest passable cell
+SNAP_RADIUS: int = 8
+
+
+def passable_cells(grid: np.ndarray) -> np.ndarray:
+    """Mask of the cells of a pathing grid units can walk on."""
+    cost = np.asarray(grid)
+    return np.isfinite(cost) & (cost > 0)
+
+
+def nearest_passable(
+    passable: np.ndarray, point: Point2, radius: int = SNAP_RADIUS, whole_grid: bool = True
+) -> Optional[tuple[int, int]]:
+    """
+    Passable cell closest to `point`, e.g. next to a structure whose own cells are
+    blocked; searched within `radius` cells first, then, if `whole_grid`, on the whole grid.
+
+    Returns:
+        (x, y) of the cell, None when no cell is passable
+    """
+    width, height = passable.shape
+    x = min(max(int(point[0]), 0), width - 1)
+    y = min(max(int(point[1]), 0), height - 1)
+    if passable[x, y]:
+        return x, y
+    for r in (radius, max(width, height)) if whole_grid else (radius,):
+        x0, y0 = max(x - r, 0), max(y - r, 0)
+        cells = np.argwhere(passable[x0 : x + r + 1, y0 : y + r + 1])
+        if len(cells):
+            squared = ((cells + (x0 + 0.5, y0 + 0.5) - (point[0], point[1])) ** 2).sum(axis=1)
+            nx, ny = cells[int(np.argmin(squared))]
+            return int(nx) + x0, int(ny) + y0
+    return None
+
+
+class Lattice:
+    """
+    The 8-connected graph of a grid's passable cells, reversed for searching from a target.
+
+    Moving to a neighbour costs the neighbour's cell cost times the step length;
+    diagonal steps may not cut corners. Which edges exist only depends on which
+    cells are passable, so it is built once and `weighted` fills in the costs of
+    each grid that differs only in cost, e.g. through enemy influence.
+    """
+
+    def __init__(self, passable: np.ndarray):
+        self.passable = passable
+        width, height = passable.shape
+        self.ids = np.full(passable.shape, -1, dtype=np.int64)
+        self.node_count = int(passable.sum())
+        self.ids[passable] = np.arange(self.node_count)
+        cells = np.arange(passable.size).reshape(passable.shape)
+
+        sources, targets, entered, lengths = [], [], [], []
+        for dx, dy in NEIGHBOUR_OFFSETS:
+            # cells (x, y) whose neighbour (x + dx, y + dy) is inside the grid
+            xs = slice(max(-dx, 0), width - max(dx, 0))
+            ys = slice(max(-dy, 0), height - max(dy, 0))
+            nxs = slice(max(dx, 0), width - max(-dx, 0))
+            nys = slice(max(dy, 0), height - max(-dy, 0))
+            valid = passable[xs, ys] & passable[nxs, nys]
+            if dx and dy:
+                # no squeezing diagonally between two blocked cells
+                valid &= passable[nxs, ys] & passable[xs, nys]
+            # reversed edge, from the neighbour back to the cell, costs entering the neighbour
+            sources.append(self.ids[nxs, nys][valid])
+            targets.append(self.ids[xs, ys][valid])
+            entered.append(cells[nxs, nys][valid])
+            lengths.append(np.full(int(valid.sum()), math.hypot(dx, dy)))
+        # build once with edge numbers as data, to learn the CSR order of the edges
+        edge_count = sum(len(part) for part in sources)
+        graph = csr_matrix(
+            (np.arange(1, edge_count + 1, dtype=np.float64), (np.concatenate(sources), np.concatenate(targets))),
+            shape=(self.node_count, self.node_count),
+        )
+        order = graph.data.astype(np.int64) - 1
+        self.indices = graph.indices
+        self.indptr = graph.indptr
+        self.entered = np.concatenate(entered)[order]
+        self.lengths = np.concatenate(lengths)[order]
+
+    def weighted(self, cost: np.ndarray) -> csr_matrix:
+        """The reversed graph with edge weights from `cost`, indexed [x, y] like the mask."""
+        weights = cost.ravel()[self.entered] * self.lengths
+        return csr_matrix((weights, self.indices, self.indptr), shape=(self.node_count, self.node_count))
+
+
+class FlowField:
+    """
+    Cost-to-target for every cell of a pathing grid, from one backward search.
+
+    The grid is indexed [x, y] like ares' grids, with np.inf on unpathable cells
+    and the cost of entering a cell elsewhere. The reversed `Lattice` is searched
+    once from the target with Dijkstra, which gives every cell's cost to reach the
+    target, and each cell stores the neighbour to step to. Any number of units can
+    then trace their route to the target from it.
+
+    A target on a blocked cell, such as an enemy structure, is searched from the
+    nearest passable cell instead.
+    """
+
+    def __init__(
+        self,
+        grid: np.ndarray,
+        target: Point2,
+        version: int = 0,
+        game_loop: int = 0,
+        lattice: Optional[Lattice] = None,
+    ):
+        """
+        Args:
+            grid: Pathing grid indexed [x, y]
+            target: Destination
+            version: `GridTracker.version` of `grid`
+            game_loop: Game loop the field is built at
+            lattice: Lattice of an earlier field, reused when the same cells are passable
+        """
+        self.version: int = version
+        self.built_at: int = game_loop
+        cost = np.asarray(grid, dtype=np.float64)
+        width, height = cost.shape
+        passable = passable_cells(cost)
+        if lattice is None or not np.array_equal(lattice.passable, passable):
+            lattice = Lattice(passable)
+        self.lattice: Lattice = lattice
+
+        self.distance = np.full(cost.shape, np.inf)
+        self.target = target
+        self.goal: Optional[tuple[int, int]] = nearest_passable(passable, target)
+        self.reachable = self.goal is not None
+        if self.reachable:
+            # reversed lattice: distances from the goal are costs to reach it
+            self.distance[passable] = dijkstra(lattice.weighted(cost), indices=lattice.ids[self.goal])
+
+        # best neighbour per cell: step cost plus the neighbour's cost to target
+        padded = np.pad(self.distance, 1, constant_values=np.inf)
+        padded_cost = np.pad(np.where(passable, cost, np.inf), 1, constant_values=np.inf)
+        scores = np.stack(
+            [
+                padded[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height]
+                + padded_cost[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height] * math.hypot(dx, dy)
+                for dx, dy in NEIGHBOUR_OFFSETS
+            ]
+        )
+        best = np.argmin(scores, axis=0)
+        offsets = np.array(NEIGHBOUR_OFFSETS)
+        stay = ~np.isfinite(np.take_along_axis(scores, best[np.newaxis], axis=0)[0]) | (self.distance == 0)
+        xs, ys = np.indices(cost.shape)
+        self.next_x = np.where(stay, xs, xs + offsets[best, 0]).astype(np.int32)
+        self.next_y = np.where(stay, ys, ys + offsets[best, 1]).astype(np.int32)
+
+    def route(self, position: Point2) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """
+        Cells from `position` to the target along the field.
+
+        Returns:
+            (xs, ys) arrays of the route's cells, None when the target cannot be reached
+        """
+        width, height = self.distance.shape
+        x = min(max(int(position[0]), 0), width - 1)
+        y = min(max(int(position[1]), 0), height - 1)
+        if not np.isfinite(self.distance[x, y]):
+            # e.g. a unit brushing a blocked cell, start from a close cell that has a route
+            start = nearest_passable(np.isfinite(self.distance), position, radius=2, whole_grid=False)
+            if start is None:
+                return None
+            x, y = start
+        next_x, next_y, distance = self.next_x, self.next_y, self.distance
+        xs, ys = [x], [y]
+        # every step strictly lowers the distance, the length bound is only a guard
+        for _ in range(distance.size):
+            if distance[x, y] == 0:
+                break
+            x, y = int(next_x[x, y]), int(next_y[x, y])
+            xs.append(x)
+            ys.append(y)
+        return np.array(xs), np.array(ys)
+
+
+class FlowFieldCache:
+    """
+    Flow fields by target cell, shared by every unit of a bot.
+
+    ares' ground grid carries enemy influence and changes somewhere most frames, and
+    a field is a full-map search. A field is rebuilt as soon as the cells that are
+    passable changed, since its routes may then run through new structures or miss
+    new openings. When only the costs changed it is still returned until it is
+    `max_age` game loops old. At most one field is built per game loop, reusing the
+    last field's `Lattice` while the passable cells are the same, and `RouteCache`
+    only asks for a field when a change lies on a route in use.
+    """
+
+    def __init__(self, max_age: int = FLOW_FIELD_MAX_AGE, max_entries: int = 4):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._fields: OrderedDict[tuple[int, int], FlowField] = OrderedDict()
+        self._lattice: Optional[Lattice] = None
+        self._last_build_loop: int = -1
+        self.builds: int = 0
+
+    def get(self, grid: np.ndarray, target: Point2, version: int, game_loop: int) -> FlowField:
+        """
+        Flow field towards `target` on `grid`, possibly built at an older version.
+
+        Args:
+            grid: Pathing grid indexed [x, y]
+            target: Destination
+            version: `GridTracker.version` of `grid`
+            game_loop: Current game loop
+        """
+        key = (int(target[0]), int(target[1]))
+        field = self._fields.get(key)
+        if field is not None and (
+            field.version == version
+            or self._last_build_loop == game_loop
+            or (
+                game_loop - field.built_at < self.max_age
+                and np.array_equal(field.lattice.passable, passable_cells(grid))
+            )
+        ):
+            self._fields.move_to_end(key)
+            return field
+
+        field = self._fields[key] = FlowField(grid, target, version, game_loop, self._lattice)
+        self._lattice = field.lattice
+        self._fields.move_to_end(key)
+        self.builds += 1
+        self._last_build_loop = game_loop
+        while len(self._fields) > self.max_entries:
+            self._fields.popitem(last=False)
+        return field
+
+
+class RouteCache:
+    """
+    Per-unit routes traced from shared flow fields, reused while their corridor holds.
+
+    A unit keeps following its route, with its waypoint `WAYPOINT_LOOKAHEAD` cells
+    ahead, until a cell of the part still ahead of it changed on the tracked grid
+    since the route's field was built, the unit strays off the route or the target
+    moves. Only then is it re-traced, from the cached field for the target, which is
+    rebuilt when the passable cells change and otherwise at most every
+    `FlowFieldCache.max_age` game loops; while that field is the one the route came
+    from, the unit keeps its route. So a long walk across
+    the map does not re-plan every step just because enemy influence moved
+    somewhere else, and a fight does not rebuild the field every frame.
+    """
+
+    def __init__(self, tracker: GridTracker, fields: Optional[FlowFieldCache] = None):
+        self.tracker = tracker
+        self.fields = fields or FlowFieldCache()
+        # tag -> (target cell, route xs, route ys, grid version, progress index)
+        self._routes: dict[int, tuple[tuple[int, int], np.ndarray, np.ndarray, int, int]] = {}
+        self.replans: int = 0
+
+    def waypoint(self, tag: int, position: Point2, grid: np.ndarray, target: Point2) -> Optional[Point2]:
+        """
+        Next waypoint for unit `tag` at `position`, None when it cannot reach `target`.
+
+        Call `GridTracker.update` with `grid` earlier in the step.
+        """
+        target_cell = (int(target[0]), int(target[1]))
+        entry = self._routes.get(tag)
+        if entry is not None and entry[0] == target_cell:
+            _, xs, ys, version, index = entry
+            # progress: the closest route cell a little ahead of where the unit was
+            ahead_x = xs[index : index + 2 * WAYPOINT_LOOKAHEAD] + 0.5 - position[0]
+            ahead_y = ys[index : index + 2 * WAYPOINT_LOOKAHEAD] + 0.5 - position[1]
+            squared = ahead_x * ahead_x + ahead_y * ahead_y
+            closest = int(np.argmin(squared))
+            if squared[closest] <= OFF_ROUTE_DISTANCE**2:
+                index += closest
+                if self.tracker.unchanged_since(version, xs[index:], ys[index:]):
+                    self._routes[tag] = (target_cell, xs, ys, version, index)
+                    return self._waypoint_at(xs, ys, index)
+                field = self.fields.get(grid, target, self.tracker.version, self.tracker.game_loop)
+                if field.version == version:
+                    # the field is not rebuilt yet, tracing it again gives the same route
+                    self._routes[tag] = (target_cell, xs, ys, version, index)
+                    return self._waypoint_at(xs, ys, index)
+
+        self.replans += 1
+        field = self.fields.get(grid, target, self.tracker.version, self.tracker.game_loop)
+        route = field.route(position)
+        if route is None:
+            self._routes.pop(tag, None)
+            return None
+        xs, ys = route
+        self._routes[tag] = (target_cell, xs, ys, field.version, 0)
+        return self._waypoint_at(xs, ys, 0)
+
+    @staticmethod
+    def _waypoint_at(xs: np.ndarray, ys: np.ndarray, index: int) -> Point2:
+        ahead = min(index + WAYPOINT_LOOKAHEAD, len(xs) - 1)
+        return Point2((int(xs[ahead]) + 0.5, int(ys[ahead]) + 0.5))
+
+    def release(self, tag: int) -> None:
+        self._routes.pop(tag, None)
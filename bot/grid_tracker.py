@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class GridTracker:
+    """
+    Versioned view of a grid that is fetched anew every step, e.g. ares' ground grid.
+
+    `update` diffs the grid against a copy of the previous one: `dirty` is the mask of
+    cells that changed on the last update, `version` goes up whenever any cell changed
+    and `last_changed` holds the version at which each cell last changed. Something
+    computed from the grid at version v, such as a path, is still valid as long as
+    none of the cells it depends on changed after v, see `unchanged_since`.
+    """
+
+    def __init__(self):
+        self.version: int = 0
+        self.dirty: np.ndarray = np.zeros((0, 0), dtype=bool)
+        self.last_changed: np.ndarray = np.zeros((0, 0), dtype=np.int64)
+        self._previous: np.ndarray = np.zeros((0, 0))
+        self.game_loop: int = -1  # Game loop of the last update
+
+    def update(self, grid: np.ndarray, game_loop: int) -> int:
+        """Diff `grid` against the last update, once per game loop; returns the version."""
+        if game_loop == self.game_loop:
+            return self.version
+        self.game_loop = game_loop
+
+        if grid.shape != self._previous.shape:
+            self.version += 1
+            self._previous = grid.copy()
+            self.dirty = np.ones(grid.shape, dtype=bool)
+            self.last_changed = np.full(grid.shape, self.version, dtype=np.int64)
+            return self.version
+
+        # unpathable cells are np.inf in both grids and compare equal
+        np.not_equal(grid, self._previous, out=self.dirty)
+        if self.dirty.any():
+            self.version += 1
+            self.last_changed[self.dirty] = self.version
+            np.copyto(self._previous, grid)
+        return self.version
+
+    def unchanged_since(self, version: int, xs: np.ndarray, ys: np.ndarray) -> bool:
+        """Whether none of the cells (xs, ys) changed after `version`."""
+        return not (self.last_changed[xs, ys] > version).any()
@@ -2,6 +2,7 @@ import sc2
 from sc2 import maps
 from sc2.ids.unit_typeid import UnitTypeId
 from sc2.position import Point2, Point3
+from sc2.units import Units
 
 from sc2.bot_ai import BotAI
 from sc2.data import Difficulty, Race
@@ -10,11 +11,31 @@ from sc2.player import Bot, Computer
 from sc2.ids.ability_id import AbilityId
 import random
 from sc2.ids.upgrade_id import UpgradeId
-import math
 import time
 
+import numpy as np
+
+from bot.army_tracker import ArmyTracker
+from bot.command_filter import CommandFilter
+from bot.map_index import MAP_STATIC_DIRECTORY, indexed_content_hash, load_static_data, save_static_data, spawn_key
+from bot.placement_grid import STATIC_PLACEMENT_ARRAYS, PlacementGrid
+from bot.spatial_index import UnitSpatialIndex, closest_targets, distance_matrix
+from bot.step_cache import step_cached
+from bot.step_profiler import StepProfiler
+from bot.step_scheduler import StepScheduler
+from bot.support_assignment import assign_supports
+from bot.unit_costs import DEFAULT_UNIT_COST, army_value, build_cost_table
+
+STEP_PROFILE_PATH = "data/han_step_profile.npz"
+STEP_TIME_BUDGET = 0.040  # seconds per frame before deferrable managers are pushed back
+
 class HanBot(BotAI):
-    def __init__(self):
+    def __init__(self, step_profile_path=STEP_PROFILE_PATH, map_static_directory=MAP_STATIC_DIRECTORY):
+        """
+        Args:
+            step_profile_path: Where on_end writes the step profile, None to not write one
+            map_static_directory: Directory of the per-map static data cache
+        """
         super().__init__()
         self.race = Race.Terran
         self.retreating_units = {}  # Initialize retreating_units dictionary
@@ -27,20 +48,199 @@ class HanBot(BotAI):
         self.worker_scout_tag = None  # Track the early game worker scout
         self.worker_scout_sent = False  # Track if we've sent the worker scout
         self.worker_scout_target = None  # Track current patrol target
+        self.enemy_unit_index = None  # Per-step KD-tree over enemy units
+        self.enemy_structure_index = None  # Per-step KD-tree over enemy structures
+        self.placement_grid = None  # Precomputed building slots, built in on_start
+        self.unit_cost_table = build_cost_table(None)  # Rebuilt from game data in on_start
+        self.army = ArmyTracker(self.unit_cost_table)  # Event-driven unit counts, supply and army value
+        self.medivac_assignments = {}  # Medivac tag -> tag of the forward unit it follows
+        self.raven_assignments = {}  # Raven tag -> tag of the forward unit it follows
+        self.command_filter = CommandFilter()  # Drops orders units are already carrying out
+        self.step_cache = {}  # Per-step memo for derived Units views, see step_cached
+        self.step_profile_path = step_profile_path
+        self.map_static_directory = map_static_directory
+        # Sections nested in manage_production get their own columns, its column is its self time
+        self.profiler = StepProfiler([
+            "manage_army",
+            "build_supply_depot_if_needed",
+            "manage_economy",
+            "manage_scouting",
+            "manage_production",
+            "build_structure_if_needed",
+            "append_addons",
+            "upgrade_army",
+            "train_military_units",
+        ])
+        # Army and defense are critical; everything listed here may wait for a quieter frame
+        self.scheduler = StepScheduler(
+            deferrable={
+                "manage_scouting",
+                "build_structure_if_needed",
+                "append_addons",
+                "upgrade_army",
+            },
+            budget=STEP_TIME_BUDGET,
+        )
         print(f"HanBot V2.0 initialized")
         # Any other initialization you need
     
+    async def on_start(self):
+        self.unit_cost_table = build_cost_table(self.game_data)
+        self.army = ArmyTracker(self.unit_cost_table)
+        self.army.seed(self.units, self.structures, self.enemy_units + self.enemy_structures)
+        self.setup_placement_grid()
+        for unit in self.structures + self.enemy_structures:
+            self.placement_grid.add(unit)
+
+    def setup_placement_grid(self):
+        """
+        Build the placement grid with the map's resources and destructables blocked,
+        restored from the map's static data cache when this map was played before
+        from the same spawn.
+        """
+        placement = self.game_info.placement_grid.data_numpy
+        pathing = self.game_info.pathing_grid.data_numpy
+        static_units = self.resources + self.destructables
+        # the start grids block the spawn's townhall, so each spawn has its own entry
+        cache_key = spawn_key(indexed_content_hash(self.game_info.local_map_path), self.start_location)
+        cached = load_static_data(cache_key, self.map_static_directory)
+        cached_names = ("placement_grid", "pathing_grid") + STATIC_PLACEMENT_ARRAYS
+        if (
+            cached is not None
+            and all(name in cached for name in cached_names)
+            and np.array_equal(cached["placement_grid"], placement)
+            and np.array_equal(cached["pathing_grid"], pathing)
+        ):
+            self.placement_grid = PlacementGrid(
+                placement,
+                pathing,
+                self.expansion_locations_list,
+                static_arrays={name: cached[name] for name in STATIC_PLACEMENT_ARRAYS},
+            )
+            self.placement_grid.track(static_units)
+            return
+        self.placement_grid = PlacementGrid(placement, pathing, self.expansion_locations_list)
+        self.placement_grid.add_all(static_units)
+        save_static_data(
+            cache_key,
+            self.map_static_directory,
+            placement_grid=placement,
+            pathing_grid=pathing,
+            **self.placement_grid.static_arrays(),
+        )
+
+    async def on_unit_created(self, unit):
+        self.army.unit_created(unit)
+
+    async def on_building_construction_started(self, unit):
+        self.army.structure_started(unit)
+        self.placement_grid.add(unit)
+
+    async def on_building_construction_complete(self, unit):
+        self.army.structure_completed(unit)
+        self.placement_grid.add(unit)
+
+    async def on_enemy_unit_entered_vision(self, unit):
+        self.army.enemy_seen(unit)
+        if unit.is_structure:
+            self.placement_grid.add(unit)
+
+    async def on_unit_type_changed(self, unit, previous_type):
+        self.army.type_changed(unit, previous_type)
+        if unit.is_structure:
+            if unit.is_flying:
+                # Lifted off, the old footprint is free again
+                self.placement_grid.remove(unit.tag)
+            else:
+                # Landed or morphed, a no-op for a footprint that is already blocked
+                self.placement_grid.add(unit)
+
+    async def on_unit_destroyed(self, unit_tag):
+        self.army.unit_destroyed(unit_tag)
+        self.placement_grid.remove(unit_tag)
+
     async def on_step(self, iteration):
-        await self.manage_army()
-        await self.build_supply_depot_if_needed()
-        await self.manage_economy()
-        await self.manage_scouting()
+        self.step_cache.clear()
+        self.scheduler.begin_step(self.profiler.last_step_ms() / 1000.0)
+        self.profiler.begin_step(iteration)
+        try:
+            await self.run_step(iteration)
+            # do() and _do_actions() are final, so redundant orders are dropped before they are sent
+            self.actions[:] = self.command_filter.filter(self.actions)
+        finally:
+            self.profiler.end_step()
+
+    async def run_step(self, iteration):
+        profiler = self.profiler
+        self.build_spatial_indices()
+        self.army.refresh_pending(self.already_pending)
+        with profiler.measure("manage_army"):
+            await self.manage_army()
+        with profiler.measure("build_supply_depot_if_needed"):
+            await self.build_supply_depot_if_needed()
+        with profiler.measure("manage_economy"):
+            await self.manage_economy()
+        await self.run_scheduled("manage_scouting", self.manage_scouting)
         if self.waiting_for_base_expansion:
             return
-        await self.manage_production()
+        with profiler.measure("manage_production"):
+            await self.manage_production()
         
         if iteration % 15 == 0:
-            await self.train_military_units()
+            with profiler.measure("train_military_units"):
+                await self.train_military_units()
+
+    async def run_scheduled(self, name, manager, *args):
+        """Run a manager under the step profiler unless the scheduler defers it to a later frame."""
+        if not self.scheduler.should_run(name, self.profiler.elapsed()):
+            return
+        section = self.profiler.measure(name)
+        with section:
+            await manager(*args)
+        self.scheduler.record(name, section.last)
+
+    async def on_end(self, game_result):
+        print(f"Game ended: {game_result}")
+        print(self.profiler.summary())
+        print(self.command_filter.summary())
+        if self.step_profile_path:
+            self.profiler.dump(self.step_profile_path)
+
+    @property
+    @step_cached
+    def ready_townhalls(self):
+        return self.townhalls.ready
+
+    @property
+    @step_cached
+    def gathering_workers(self):
+        return self.workers.gathering
+
+    @property
+    @step_cached
+    def enemy_combat_units(self):
+        """Visible enemy units that are neither structures nor workers."""
+        return self.enemy_units.filter(
+            lambda unit: not unit.is_structure and unit.type_id not in {
+                UnitTypeId.SCV,
+                UnitTypeId.PROBE,
+                UnitTypeId.DRONE,
+                UnitTypeId.MULE
+            }
+        )
+
+    @step_cached
+    def ready_structures(self, unit_type):
+        return self.structures(unit_type).ready
+
+    @step_cached
+    def structure_tags(self, unit_type):
+        return self.structures(unit_type).tags
+
+    def build_spatial_indices(self):
+        """Rebuild the per-step spatial indices used by proximity queries."""
+        self.enemy_unit_index = UnitSpatialIndex(self.enemy_units)
+        self.enemy_structure_index = UnitSpatialIndex(self.enemy_structures)
 
     async def manage_economy(self):
         await self.distribute_workers()
@@ -61,13 +261,13 @@ class HanBot(BotAI):
 
     async def manage_mules(self):
         # Transform Command Center to Orbital Command if possible
-        for cc in self.structures(UnitTypeId.COMMANDCENTER).ready.idle:
+        for cc in self.ready_structures(UnitTypeId.COMMANDCENTER).idle:
             if self.can_afford(UnitTypeId.ORBITALCOMMAND):
                 cc(AbilityId.UPGRADETOORBITAL_ORBITALCOMMAND)
 
         """Manage MULE production and optimal mineral mining."""
         # Check for Orbital Commands
-        for oc in self.structures(UnitTypeId.ORBITALCOMMAND).ready:
+        for oc in self.ready_structures(UnitTypeId.ORBITALCOMMAND):
             # Only call down MULE if we have enough energy
             if oc.energy < 50:
                 return
@@ -88,29 +288,32 @@ class HanBot(BotAI):
 
     async def train_workers_if_needed(self):
         # Modified to account for MULE income
-        mule_count = self.units(UnitTypeId.MULE).amount
+        mule_count = self.army.count(UnitTypeId.MULE)
         effective_worker_count = self.workers.amount + (mule_count * 4)  # Each MULE mines like ~4 SCVs
         
         if effective_worker_count >= 80:
             return
         
-        if effective_worker_count >= 20 * self.townhalls.ready.amount:
+        if effective_worker_count >= 20 * self.ready_townhalls.amount:
             return
         
-        for cc in self.townhalls.ready.idle:
+        for cc in self.ready_townhalls.idle:
             if self.can_afford(UnitTypeId.SCV) and self.supply_left > 0:
                 cc.train(UnitTypeId.SCV)
 
     async def manage_production(self):
         # print(f"manage_production")
         await self.build_gas_if_needed()
+        await self.run_scheduled("build_structure_if_needed", self.build_structures_if_needed)
+        await self.run_scheduled("append_addons", self.append_addons)
+        await self.run_scheduled("upgrade_army", self.upgrade_army)
+
+    async def build_structures_if_needed(self):
         await self.build_structure_if_needed(UnitTypeId.FACTORY)
         await self.build_structure_if_needed(UnitTypeId.BARRACKS)
         await self.build_structure_if_needed(UnitTypeId.STARPORT)
         await self.build_structure_if_needed(UnitTypeId.ENGINEERINGBAY)
         await self.build_structure_if_needed(UnitTypeId.ARMORY)
-        await self.append_addons()
-        await self.upgrade_army()
 
     async def manage_army(self):
         # Get all military units
@@ -124,8 +327,9 @@ class HanBot(BotAI):
         medivacs = medivacs.filter(lambda u: u.tag not in self.scout_tags)
         ravens = ravens.filter(lambda u: u.tag not in self.scout_tags)
         
-        await self.manage_medivacs(medivacs, military_units)
-        await self.manage_ravens(ravens, military_units)
+        forward_units = self.get_front_line(military_units)
+        await self.manage_medivacs(medivacs, military_units, forward_units)
+        await self.manage_ravens(ravens, military_units, forward_units)
 
         if self.detected_cheese():
             print(f"detected cheese")
@@ -135,10 +339,7 @@ class HanBot(BotAI):
         # Normal army management for mid/late game
         self.base_is_under_attack = False
         if self.townhalls:
-            for base in self.townhalls:
-                nearby_enemies = self.enemy_units.filter(
-                    lambda unit: unit.distance_to(base) < 30
-                )
+            for nearby_enemies in self.enemy_unit_index.query_radius(self.townhalls, 30):
                 if nearby_enemies:
                     print(f"Defending against enemies near base!")
                     self.base_is_under_attack = True
@@ -197,7 +398,7 @@ class HanBot(BotAI):
             
             # If scout is under attack and low health, retreat it
             if scout.health_percentage < 0.3:
-                nearby_enemies = self.enemy_units.filter(lambda e: e.distance_to(scout) < 10)
+                nearby_enemies = self.enemy_unit_index.within(scout, 10)
                 if nearby_enemies:
                     retreat_pos = scout.position.towards(self.start_location, 10)
                     scout.move(retreat_pos)
@@ -229,7 +430,7 @@ class HanBot(BotAI):
         # Send worker scout at 14 supply (or around 60 seconds)
         if not self.worker_scout_sent and (self.supply_used >= 14 or self.time >= 10):
             # Find an available worker
-            workers = self.workers.gathering
+            workers = self.gathering_workers
             if workers:
                 scout = workers.furthest_to(self.start_location)  # Take worker furthest from minerals
                 self.worker_scout_tag = scout.tag
@@ -363,18 +564,15 @@ class HanBot(BotAI):
         
         th = self.start_location
 
-        # Check for both enemy units and structures
-        nearby_enemies = self.enemy_units.filter(
+        # Check for both enemy units and structures close to our base
+        nearby_enemies = self.enemy_unit_index.within(th, 30).filter(
             lambda unit: (
-                unit.distance_to(th) < 30 and  # Close to our base
                 not unit.is_structure and      # Not a building
                 unit.type_id not in {UnitTypeId.PROBE, UnitTypeId.SCV, UnitTypeId.DRONE}  # Not a worker
             )
         )
         
-        nearby_structures = self.enemy_structures.filter(
-            lambda structure: structure.distance_to(th) < 30  # Close to our base
-        )
+        nearby_structures = self.enemy_structure_index.within(th, 30)
         
         # If we spot enemy units or structures near our base
         if nearby_enemies or nearby_structures:
@@ -384,28 +582,30 @@ class HanBot(BotAI):
 
     async def handle_early_game_defense(self, military_units, tanks):
         """Handle early game defense while maintaining economy and counter-attacking."""
-        for th in self.townhalls:
+        # One batched query per group for all townhalls
+        enemies_near_bases = self.enemy_unit_index.query_radius(self.townhalls, 30)
+        structures_near_bases = self.enemy_structure_index.query_radius(self.townhalls, 30)
+        workers_near_bases = UnitSpatialIndex(self.workers).query_radius(self.townhalls, 10)
+
+        for th, enemies_near_th, structures_near_th, nearby_workers in zip(
+            self.townhalls, enemies_near_bases, structures_near_bases, workers_near_bases
+        ):
             # Check for both enemy units and structures
-            nearby_enemies = self.enemy_units.filter(
+            nearby_enemies = enemies_near_th.filter(
                 lambda unit: (
-                    unit.distance_to(th) < 30 and
                     not unit.is_structure and
                     unit.type_id not in {UnitTypeId.PROBE, UnitTypeId.SCV, UnitTypeId.DRONE}
                 )
             )
             
             # Separate workers from other enemy units
-            nearby_enemy_workers = self.enemy_units.filter(
-                lambda unit: (
-                    unit.distance_to(th) < 30 and
-                    unit.type_id in {UnitTypeId.PROBE, UnitTypeId.SCV, UnitTypeId.DRONE}
-                )
+            nearby_enemy_workers = enemies_near_th.filter(
+                lambda unit: unit.type_id in {UnitTypeId.PROBE, UnitTypeId.SCV, UnitTypeId.DRONE}
             )
             
             # Identify offensive structures (those that can attack)
-            offensive_structures = self.enemy_structures.filter(
+            offensive_structures = structures_near_th.filter(
                 lambda structure: (
-                    structure.distance_to(th) < 30 and
                     structure.type_id in {
                         UnitTypeId.PHOTONCANNON, UnitTypeId.SPINECRAWLER, 
                         UnitTypeId.SPORECRAWLER, UnitTypeId.BUNKER,
@@ -415,9 +615,8 @@ class HanBot(BotAI):
             )
             
             # Other nearby structures
-            other_structures = self.enemy_structures.filter(
+            other_structures = structures_near_th.filter(
                 lambda structure: (
-                    structure.distance_to(th) < 30 and
                     structure.type_id not in {
                         UnitTypeId.PHOTONCANNON, UnitTypeId.SPINECRAWLER, 
                         UnitTypeId.SPORECRAWLER, UnitTypeId.BUNKER,
@@ -435,8 +634,7 @@ class HanBot(BotAI):
                 enemy_power = (len(nearby_enemies) + len(offensive_structures) * 3 + 
                              len(nearby_enemy_workers) + len(other_structures))
                 
-                # Worker defense allocation
-                nearby_workers = self.workers.filter(lambda w: w.distance_to(th) < 10)
+                # Worker defense allocation (nearby_workers are the workers within 10 of th)
                 current_defender_tags = getattr(self, 'defender_worker_tags', set())
                 
                 # Calculate how many workers we need
@@ -540,8 +738,8 @@ class HanBot(BotAI):
             return
             
         # Determine rally point - closest base to map center or main base ramp
-        if self.townhalls.ready and self.townhalls.ready.amount > 1:
-            forward_base = self.townhalls.ready.closest_to(self.game_info.map_center)
+        if self.ready_townhalls and self.ready_townhalls.amount > 1:
+            forward_base = self.ready_townhalls.closest_to(self.game_info.map_center)
             rally_point = forward_base.position.towards(self.game_info.map_center, 8)
         else:
             rally_point = self.main_base_ramp.top_center
@@ -609,18 +807,28 @@ class HanBot(BotAI):
         enemy_threats = enemy_units + offensive_structures
         
         # Other enemy structures
+        offensive_tags = offensive_structures.tags
         other_structures = self.enemy_structures.filter(
-            lambda structure: structure not in offensive_structures
+            lambda structure: structure.tag not in offensive_tags
         )
         
         enemy_start = self.enemy_start_locations[0]
+
+        # Target assignment for the whole army in one pass: one distance matrix per
+        # target group, rows are marines/marauders followed by tanks
+        attackers = list(military_units) + list(tanks)
+        attack_ranges = np.array([15.0] * len(military_units) + [25.0] * len(tanks))
+        threat_list = list(enemy_threats)
+        structure_list = list(other_structures)
+        closest_threat_index, threat_in_range = closest_targets(
+            distance_matrix(attackers, threat_list), attack_ranges
+        )
+        closest_structure_index, _ = closest_targets(distance_matrix(attackers, structure_list))
+        defend_list = list(nearby_enemies) if nearby_enemies is not None else []
+        closest_defend_index, _ = closest_targets(distance_matrix(attackers, defend_list))
         
         # Rest of the attack logic for military units
-        for unit in military_units:
-            # Find nearby enemies including offensive structures
-            nearby_threats = enemy_threats.filter(
-                lambda enemy: enemy.distance_to(unit) < 15
-            )
+        for i, unit in enumerate(military_units):
             
             # Check if unit is currently retreating
             if unit.tag in self.retreating_units:
@@ -628,8 +836,8 @@ class HanBot(BotAI):
                 if current_time - retreat_time >= 10:  # 10 seconds retreat limit
                     del self.retreating_units[unit.tag]
             
-            if nearby_threats:
-                closest_threat = nearby_threats.closest_to(unit)
+            if threat_in_range[i]:
+                closest_threat = threat_list[closest_threat_index[i]]
                 
                 # Handle unit actions based on health
                 if unit.health_percentage < 0.4 and unit.tag not in self.retreating_units and unit.tag not in self.historical_retreating_units:
@@ -651,26 +859,21 @@ class HanBot(BotAI):
             
             elif unit.tag not in self.retreating_units:
                 # No nearby threats, attack other structures or enemy base
-                if other_structures:
-                    closest_structure = other_structures.closest_to(unit)
-                    unit.attack(closest_structure)
+                if structure_list:
+                    unit.attack(structure_list[closest_structure_index[i]])
                 # no nearby threats or structures if base is under attack, defend base
-                elif self.base_is_under_attack and nearby_enemies is not None:
-                    unit.attack(nearby_enemies.closest_to(unit))
+                elif self.base_is_under_attack and defend_list:
+                    unit.attack(defend_list[closest_defend_index[i]])
                 else:
                     unit.attack(enemy_start)
         
-        # Handle tanks with similar priority
-        for tank in tanks:
+        # Handle tanks with similar priority, using the same matrices with their 25 range
+        for i, tank in enumerate(tanks, start=len(military_units)):
             target = enemy_start
-            # Find nearby enemies including offensive structures
-            nearby_threats = enemy_threats.filter(
-                lambda enemy: enemy.distance_to(tank) < 25
-            )
-            if nearby_threats:
-                target = nearby_threats.closest_to(tank)
-            elif other_structures:
-                target = other_structures.closest_to(tank)
+            if threat_in_range[i]:
+                target = threat_list[closest_threat_index[i]]
+            elif structure_list:
+                target = structure_list[closest_structure_index[i]]
             
             await self.manage_attacking_tank(tank, target)
 
@@ -698,98 +901,76 @@ class HanBot(BotAI):
         if not ravens or not enemy_units:
             return
         # Handle Raven auto-turrets
-        for raven in ravens:
-            if raven.energy >= 50:  # Auto-Turret costs 50 energy
-                nearby_enemies = enemy_units.filter(
-                    lambda unit: unit.distance_to(raven) < 15
-                )
+        casters = ravens.filter(lambda raven: raven.energy >= 50)  # Auto-Turret costs 50 energy
+        enemies_near_casters = UnitSpatialIndex(enemy_units).query_radius(casters, 15)
+        for raven, nearby_enemies in zip(casters, enemies_near_casters):
+            if nearby_enemies:
+                # Find the best position for the turret
+                if len(nearby_enemies) >= 3:
+                    # Drop at center of enemy cluster
+                    turret_position = nearby_enemies.center
+                else:
+                    # Drop at closest enemy
+                    turret_position = nearby_enemies.closest_to(raven).position
                 
-                if nearby_enemies:
-                    # Find the best position for the turret
-                    if len(nearby_enemies) >= 3:
-                        # Drop at center of enemy cluster
-                        turret_position = nearby_enemies.center
-                    else:
-                        # Drop at closest enemy
-                        turret_position = nearby_enemies.closest_to(raven).position
-                    
-                    # Ensure the position is on valid terrain
-                    if self.in_pathing_grid(turret_position):
-                        raven(AbilityId.BUILDAUTOTURRET_AUTOTURRET, turret_position)
-                        # print(f"Raven {raven.tag} dropping turret during attack")
+                # Ensure the position is on valid terrain
+                if self.in_pathing_grid(turret_position):
+                    raven(AbilityId.BUILDAUTOTURRET_AUTOTURRET, turret_position)
+                    # print(f"Raven {raven.tag} dropping turret during attack")
     
 
         # Get closest enemy unit for each raven    
 
-    async def manage_medivacs(self, medivacs, military_units):
-        """Manage medivac movement to follow army units."""
-        if not medivacs or not military_units:
-            return
-
-        enemies = self.enemy_units | self.enemy_structures
-        if not enemies:
-            # If no enemies, follow army center as before
-            center = military_units.center
-            for medivac in medivacs:
-                if medivac.distance_to(center) > 5:
-                    medivac.move(center)
-            return
-
-        # Get units that are close to enemies
-        forward_units = military_units.filter(
-            lambda unit: enemies.closest_to(unit).distance_to(unit) < 15
+    def get_front_line(self, military_units):
+        """Military units within 15 of an enemy unit or structure, computed once per step."""
+        if not military_units:
+            return military_units
+        near_enemy = self.enemy_unit_index.any_within(military_units, 15) | self.enemy_structure_index.any_within(
+            military_units, 15
         )
+        return Units([unit for unit, forward in zip(military_units, near_enemy) if forward], self)
 
+    def follow_army(self, supports, military_units, forward_units, assignments, follow_distance, center_distance):
+        """
+        Move support units to their assigned forward unit, or to the army center when nothing is forward.
+
+        Returns:
+            dict of support tag -> followed unit tag, to keep assignments sticky next step
+        """
         if not forward_units:
             # If no units close to enemies, follow army center
             center = military_units.center
-            for medivac in medivacs:
-                if medivac.distance_to(center) > 5:
-                    medivac.move(center)
+            for support in supports:
+                if support.distance_to(center) > center_distance:
+                    support.move(center)
+            return {}
+
+        assigned = assign_supports(supports, forward_units, assignments)
+        for support in supports:
+            target_unit = assigned[support.tag]
+            if support.distance_to(target_unit) > follow_distance:
+                support.move(target_unit.position)
+        return {tag: unit.tag for tag, unit in assigned.items()}
+
+    async def manage_medivacs(self, medivacs, military_units, forward_units):
+        """Manage medivac movement to follow army units."""
+        if not medivacs or not military_units:
             return
+        self.medivac_assignments = self.follow_army(
+            medivacs, military_units, forward_units, self.medivac_assignments, 3, 5
+        )
 
-        # Assign each medivac to a random forward unit
-        for medivac in medivacs:
-            target_unit = random.choice(forward_units)
-            if medivac.distance_to(target_unit) > 3:
-                medivac.move(target_unit.position)
-
-    async def manage_ravens(self, ravens, military_units):
+    async def manage_ravens(self, ravens, military_units, forward_units):
         """Manage raven movement to follow army units and use abilities."""
         if not ravens or not military_units:
             return
-
-        enemies = self.enemy_units | self.enemy_structures
-        if not enemies:
-            # If no enemies, follow army center
-            center = military_units.center
-            for raven in ravens:
-                if raven.distance_to(center) > 7:
-                    raven.move(center)
-            return
-
-        # Get units that are close to enemies
-        forward_units = military_units.filter(
-            lambda unit: enemies.closest_to(unit).distance_to(unit) < 15
+        self.raven_assignments = self.follow_army(
+            ravens, military_units, forward_units, self.raven_assignments, 5, 7
         )
 
-        if not forward_units:
-            # If no units close to enemies, follow army center
-            center = military_units.center
-            for raven in ravens:
-                if raven.distance_to(center) > 7:
-                    raven.move(center)
-            return
-
-        # Assign each raven to a random forward unit
-        for raven in ravens:
-            target_unit = random.choice(forward_units)
-            if raven.distance_to(target_unit) > 5:
-                raven.move(target_unit.position)
-
     async def build_supply_depot_if_needed(self):
         if self.supply_left < 6 * self.townhalls.amount:
-            max_concurrent = 2 if self.townhalls.ready.amount > 1 else 1
+            max_concurrent = 2 if self.ready_townhalls.amount > 1 else 1
             pending_depots = self.already_pending(UnitTypeId.SUPPLYDEPOT)
             near_position = self.start_location
             if self.townhalls:
@@ -803,11 +984,11 @@ class HanBot(BotAI):
                 pending_depots += 1
 
         # Lower completed supply depots
-        for depot in self.structures(UnitTypeId.SUPPLYDEPOT).ready:
+        for depot in self.ready_structures(UnitTypeId.SUPPLYDEPOT):
             depot(AbilityId.MORPH_SUPPLYDEPOT_LOWER)
         
         # Raise if enemies nearby
-        for depot in self.structures(UnitTypeId.SUPPLYDEPOTLOWERED).ready:
+        for depot in self.ready_structures(UnitTypeId.SUPPLYDEPOTLOWERED):
             if self.enemy_units:
                 closest_enemy = self.enemy_units.closest_to(depot)
                 if closest_enemy.distance_to(depot) < 10:
@@ -816,11 +997,11 @@ class HanBot(BotAI):
     def get_max_refineries(self):
         if self.get_total_structure_count(UnitTypeId.BARRACKS) == 0:
             return 0
-        if self.townhalls.ready.amount == 1:
+        if self.ready_townhalls.amount == 1:
             return 1
-        if self.townhalls.ready.amount == 2:
+        if self.ready_townhalls.amount == 2:
             return 4
-        return self.townhalls.ready.amount * 1.2 + 2
+        return self.ready_townhalls.amount * 1.2 + 2
 
     async def build_gas_if_needed(self):
         if self.get_total_structure_count(UnitTypeId.REFINERY) >= self.get_max_refineries():
@@ -829,15 +1010,18 @@ class HanBot(BotAI):
             await self.build_one_gas()
 
     async def build_one_gas(self):
-        for th in self.townhalls.ready:
-            vgs = self.vespene_geyser.closer_than(10, th)
-            for vg in vgs:
-                if await self.can_place_single(UnitTypeId.REFINERY, vg.position):
-                    workers = self.workers.gathering
-                    if workers:
-                        worker = workers.closest_to(vg)
-                        worker.build_gas(vg)
-                        return
+        geysers = [vg for th in self.ready_townhalls for vg in self.vespene_geyser.closer_than(10, th)]
+        if not geysers:
+            return
+        # Check every geyser in one placement query
+        placeable = await self.can_place(UnitTypeId.REFINERY, [vg.position for vg in geysers])
+        for vg, can_place in zip(geysers, placeable):
+            if can_place:
+                workers = self.gathering_workers
+                if workers:
+                    worker = workers.closest_to(vg)
+                    worker.build_gas(vg)
+                    return
 
     async def build_structure_if_needed(self, unit_type):
         if not self.can_afford(unit_type):
@@ -877,7 +1061,7 @@ class HanBot(BotAI):
         
         if pos:
             #print(f"Building {unit_type} at position {pos}")
-            await self.build(unit_type, near=pos)
+            self.build_at(unit_type, pos)
         else:
             # Fallback method 1: Try direct placement
             print(f"Fallback: Using direct placement for {unit_type}")
@@ -887,42 +1071,57 @@ class HanBot(BotAI):
                 base_pos.towards(self.game_info.map_center, 16)
             ]
             
-            for fallback_pos in potential_positions:
-                if await self.can_place(unit_type, fallback_pos):
-                    await self.build(unit_type, near=fallback_pos)
+            # Check all fallback positions in one placement query
+            placeable = await self.can_place(unit_type, potential_positions)
+            for fallback_pos, can_place in zip(potential_positions, placeable):
+                if can_place:
+                    self.build_at(unit_type, fallback_pos)
                     return
             
             # Fallback method 2: Just try the standard build method near base
             await self.build(unit_type, near=base_pos)
 
 
+    def build_at(self, unit_type, pos):
+        """
+        Order a worker to build at a position that was already confirmed placeable.
+
+        Unlike `self.build`, this does not run another placement search (and client query) around `pos`.
+        """
+        worker = self.select_build_worker(pos)
+        if worker is None:
+            return False
+        worker.build(unit_type, pos)
+        return True
+
     def get_max_barracks(self):
-        if self.townhalls.ready.amount == 1 and self.get_total_structure_count(UnitTypeId.BARRACKS) < 2:
+        if self.ready_townhalls.amount == 1 and self.get_total_structure_count(UnitTypeId.BARRACKS) < 2:
             return 1
         barracks_by_workers = self.workers.amount // 6
         maxinum = 12
-        if self.get_max_factories() == 0:
+        max_factories = self.get_max_factories()
+        if max_factories == 0:
             maxinum = 3
-        if self.structures(UnitTypeId.FACTORY).ready.amount == 0:
+        if self.army.count(UnitTypeId.FACTORY) == 0:
             maxinum = 3
-        if self.get_max_factories() == 1:
+        if max_factories == 1:
             maxinum = 6
         return min(barracks_by_workers, maxinum)
 
     def get_max_factories(self):
-        if not self.structures(UnitTypeId.BARRACKS).ready:
+        if not self.army.count(UnitTypeId.BARRACKS):
             return 0
         #if self.get_military_supply() < 10:
         #    return 0
-        if self.townhalls.ready.amount <= 2:
+        if self.ready_townhalls.amount <= 2:
             return 1
-        if self.townhalls.ready.amount <= 3:
+        if self.ready_townhalls.amount <= 3:
             return 2
         return 3
 
 
     def get_max_starports(self):
-        if not self.structures(UnitTypeId.FACTORY).ready:
+        if not self.army.count(UnitTypeId.FACTORY):
             return 0
         if self.get_military_supply() < 10:
             return 0
@@ -930,16 +1129,16 @@ class HanBot(BotAI):
 
 
     def get_max_engineering_bays(self):
-        if not self.structures(UnitTypeId.FACTORY).ready:
+        if not self.army.count(UnitTypeId.FACTORY):
             return 0
         if self.get_military_supply() < 30:
             return 0
         return 2
 
     def get_max_armory(self):
-        if not self.structures(UnitTypeId.FACTORY).ready:
+        if not self.army.count(UnitTypeId.FACTORY):
             return 0
-        if not self.structures(UnitTypeId.ENGINEERINGBAY).ready:
+        if not self.army.count(UnitTypeId.ENGINEERINGBAY):
             return 0
         if self.get_military_supply() < 40:
             return 0
@@ -977,31 +1176,31 @@ class HanBot(BotAI):
             self.train_ravens()
 
     def get_total_units_count(self, unit_type):
-        return self.units(unit_type).amount + self.already_pending(unit_type)
+        return self.army.count(unit_type) + self.army.pending(unit_type)
 
     def get_desired_marines(self):
-        if not self.structures(UnitTypeId.BARRACKS).ready:
+        if not self.army.count(UnitTypeId.BARRACKS):
             return 0
         marine_count = self.get_total_units_count(UnitTypeId.MARINE)
         marauder_count = self.get_total_units_count(UnitTypeId.MARAUDER)
         return marauder_count - marine_count + 8
 
     def get_desired_marauders(self):
-        if not self.structures(UnitTypeId.BARRACKS).ready:
+        if not self.army.count(UnitTypeId.BARRACKS):
             return 0
         marauder_count = self.get_total_units_count(UnitTypeId.MARAUDER)
         marine_count = self.get_total_units_count(UnitTypeId.MARINE)
         return marine_count - marauder_count + 2
    
     def get_desired_tanks(self):
-        if not self.structures(UnitTypeId.FACTORY).ready:
+        if not self.army.count(UnitTypeId.FACTORY):
             return 0
         if self.get_military_supply() < 5:
             return 0
         return 8
 
     def get_desired_medivacs(self):
-        if not self.structures(UnitTypeId.STARPORT).ready:
+        if not self.army.count(UnitTypeId.STARPORT):
             return 0
 
         if self.get_military_supply() < 10:
@@ -1013,40 +1212,40 @@ class HanBot(BotAI):
         return desired_medivacs
 
     def get_desired_ravens(self):
-        if not self.structures(UnitTypeId.STARPORT).ready:
+        if not self.army.count(UnitTypeId.STARPORT):
             return 0
         if self.get_military_supply() < 10:
             return 0
         return 2
 
     def train_tanks(self):
-        for factory in self.structures(UnitTypeId.FACTORY).ready.idle:
+        for factory in self.ready_structures(UnitTypeId.FACTORY).idle:
             if factory.has_add_on:
-                if factory.add_on_tag in self.structures(UnitTypeId.FACTORYTECHLAB).tags:
+                if factory.add_on_tag in self.structure_tags(UnitTypeId.FACTORYTECHLAB):
                     if self.can_afford(UnitTypeId.SIEGETANK):
                         factory.train(UnitTypeId.SIEGETANK)
                     else:
                         print(f"cannot afford tanks")
 
     def train_medivacs(self):
-        for starport in self.structures(UnitTypeId.STARPORT).ready.idle:
+        for starport in self.ready_structures(UnitTypeId.STARPORT).idle:
             if self.can_afford(UnitTypeId.MEDIVAC):
                 starport.train(UnitTypeId.MEDIVAC)
 
     def train_ravens(self):
-        for starport in self.structures(UnitTypeId.STARPORT).ready.idle:
+        for starport in self.ready_structures(UnitTypeId.STARPORT).idle:
             if starport.has_add_on:
-                if starport.add_on_tag in self.structures(UnitTypeId.STARPORTTECHLAB).tags:
+                if starport.add_on_tag in self.structure_tags(UnitTypeId.STARPORTTECHLAB):
                     if self.can_afford(UnitTypeId.RAVEN):
                         starport.train(UnitTypeId.RAVEN)
 
     def train_marines(self):
-        for barracks in self.structures(UnitTypeId.BARRACKS).ready.idle:
+        for barracks in self.ready_structures(UnitTypeId.BARRACKS).idle:
             if barracks.has_add_on:
-                if barracks.add_on_tag in self.structures(UnitTypeId.BARRACKSTECHLAB).tags:
+                if barracks.add_on_tag in self.structure_tags(UnitTypeId.BARRACKSTECHLAB):
                     if self.can_afford(UnitTypeId.MARINE):
                         barracks.train(UnitTypeId.MARINE)
-                elif barracks.add_on_tag in self.structures(UnitTypeId.BARRACKSREACTOR).tags:
+                elif barracks.add_on_tag in self.structure_tags(UnitTypeId.BARRACKSREACTOR):
                     for _ in range(2):
                         if self.can_afford(UnitTypeId.MARINE):
                             barracks.train(UnitTypeId.MARINE)
@@ -1055,9 +1254,9 @@ class HanBot(BotAI):
                     barracks.train(UnitTypeId.MARINE)
 
     def train_marauders(self):
-        for barracks in self.structures(UnitTypeId.BARRACKS).ready.idle:
+        for barracks in self.ready_structures(UnitTypeId.BARRACKS).idle:
             if barracks.has_add_on:
-                if barracks.add_on_tag in self.structures(UnitTypeId.BARRACKSTECHLAB).tags:
+                if barracks.add_on_tag in self.structure_tags(UnitTypeId.BARRACKSTECHLAB):
                     if self.can_afford(UnitTypeId.MARAUDER):
                         barracks.train(UnitTypeId.MARAUDER)
 
@@ -1082,30 +1281,18 @@ class HanBot(BotAI):
             }
         )
         
-        # Define worker unit types
-        worker_types = {
-            UnitTypeId.SCV,
-            UnitTypeId.PROBE,
-            UnitTypeId.DRONE,
-            UnitTypeId.MULE
-        }
-        
-        # Filter out workers and structures from enemy units
-        enemy_combat_units = self.enemy_units.filter(
-            lambda unit: not unit.is_structure and unit.type_id not in worker_types
-        )
+        # Workers and structures filtered out of enemy units
+        enemy_combat_units = self.enemy_combat_units
         
+        army_index = UnitSpatialIndex(military_units)
+
         # Check for enemies near our bases first
         if self.townhalls:
-            for base in self.townhalls:
-                nearby_enemies = enemy_combat_units.filter(
-                    lambda unit: unit.distance_to(base) < 30
-                )
+            enemies_near_bases = UnitSpatialIndex(enemy_combat_units).query_radius(self.townhalls, 30)
+            for base, nearby_enemies in zip(self.townhalls, enemies_near_bases):
                 if nearby_enemies:
                     # If we have a significant force near the threatened base, counter-attack
-                    nearby_defenders = military_units.filter(
-                        lambda unit: unit.distance_to(base) < 40
-                    )
+                    nearby_defenders = army_index.within(base, 40)
                     if len(nearby_defenders) > len(nearby_enemies) * 1.5:
                         # print(f"Counter-attacking near base with superior force!")
                         return True
@@ -1122,23 +1309,15 @@ class HanBot(BotAI):
         # Check for numerical advantage based on unit cost (minerals + gas)
         if len(enemy_combat_units) > 5:
             # Calculate total value of enemy units
-            enemy_army_value = sum(
-                sum(self.get_unit_mineral_and_gas_cost(unit.type_id))  # Sum of minerals and gas
-                for unit in enemy_combat_units
-            )
+            enemy_army_value = self.get_army_value(enemy_combat_units)
             
             # Only count our units that are close enough to the enemy (within 30 distance)
             if enemy_combat_units:
                 enemy_center = enemy_combat_units.center
-                nearby_military_units = military_units.filter(
-                    lambda unit: unit.distance_to(enemy_center) < 30
-                )
+                nearby_military_units = army_index.within(enemy_center, 30)
                 
                 # Calculate our nearby military value
-                our_nearby_army_value = sum(
-                    sum(self.get_unit_mineral_and_gas_cost(unit.type_id))  # Sum of minerals and gas
-                    for unit in nearby_military_units
-                )
+                our_nearby_army_value = self.get_army_value(nearby_military_units)
                 
                 # Attack if we have a significant army value advantage
                 advantage_ratio = 2.0
@@ -1154,13 +1333,7 @@ class HanBot(BotAI):
         return False
 
     def get_military_supply(self):
-        military_supply = 0
-        military_supply += self.units(UnitTypeId.MARINE).amount * 1
-        military_supply += self.units(UnitTypeId.MARAUDER).amount * 2
-        military_supply += self.units(UnitTypeId.REAPER).amount * 1
-        military_supply += self.units(UnitTypeId.SIEGETANK).amount * 4  # Siege Tank costs 3 supply
-        military_supply += self.units(UnitTypeId.SIEGETANKSIEGED).amount * 4  # Include sieged tanks
-        return military_supply
+        return self.army.military_supply
 
     async def append_addons(self):
         """Manage add-ons for barracks, maintaining a 6:4 ratio of tech labs to reactors."""
@@ -1169,7 +1342,7 @@ class HanBot(BotAI):
         reactor_count = self.structures(UnitTypeId.BARRACKSREACTOR).amount
         total_addons = techlab_count + reactor_count
         
-        for barracks in self.structures(UnitTypeId.BARRACKS).ready.idle:
+        for barracks in self.ready_structures(UnitTypeId.BARRACKS).idle:
             if not barracks.has_add_on:
                 # Calculate desired ratio (6:4)
                 desired_techlab_ratio = 0.6
@@ -1186,14 +1359,14 @@ class HanBot(BotAI):
                 total_addons += 1
 
         # Add tech lab to factory for tanks
-        for factory in self.structures(UnitTypeId.FACTORY).ready.idle:
+        for factory in self.ready_structures(UnitTypeId.FACTORY).idle:
             if not factory.has_add_on:
                 await self.append_addon(UnitTypeId.FACTORY, UnitTypeId.FACTORYFLYING, UnitTypeId.FACTORYTECHLAB)
 
         # Add tech lab to first starport for ravens, reactors to others
-        starports = self.structures(UnitTypeId.STARPORT).ready.idle
+        starports = self.ready_structures(UnitTypeId.STARPORT).idle
         tech_lab_starports = self.structures(UnitTypeId.STARPORT).filter(
-            lambda sp: sp.has_add_on and sp.add_on_tag in self.structures(UnitTypeId.STARPORTTECHLAB).tags
+            lambda sp: sp.has_add_on and sp.add_on_tag in self.structure_tags(UnitTypeId.STARPORTTECHLAB)
         )
         
         for starport in starports:
@@ -1251,15 +1424,15 @@ class HanBot(BotAI):
         if len(self.townhalls) > 12:
             return False
 
-        if self.structures(UnitTypeId.BARRACKS).ready.amount < 1:
+        if self.army.count(UnitTypeId.BARRACKS) < 1:
             return False
         
         # Check if we're already expanding for equal or more than 2 bases
-        if self.already_pending(UnitTypeId.COMMANDCENTER) >= 1:
+        if self.army.pending(UnitTypeId.COMMANDCENTER) >= 1:
             return False
 
         # Check if current bases are saturated (16 workers per base is optimal)
-        for th in self.townhalls.ready:
+        for th in self.ready_townhalls:
             # Get nearby mineral fields
             mineral_fields = self.mineral_field.closer_than(10, th)
             
@@ -1337,11 +1510,11 @@ class HanBot(BotAI):
 
     async def upgrade_army(self):
         # Get Engineering Bays
-        ebays = self.structures(UnitTypeId.ENGINEERINGBAY).ready
+        ebays = self.ready_structures(UnitTypeId.ENGINEERINGBAY)
         if not ebays:
             return
 
-        has_armory = self.structures(UnitTypeId.ARMORY).ready.exists
+        has_armory = self.ready_structures(UnitTypeId.ARMORY).exists
 
         # Use first ebay for weapons
         if len(ebays) >= 1:
@@ -1370,6 +1543,10 @@ class HanBot(BotAI):
     async def find_placement(self, building_type, near_position, min_distance=7, max_distance=30, addon_space=False, placement_step=2):
         """
         Find a suitable placement for a building that ensures proper spacing and unit pathing.
+
+        Candidate slots come from the precomputed placement grid, which already accounts for
+        terrain, known structures, addon room, expansion clearance and pathing around the
+        building. The candidates are confirmed with the game in a single batched query.
         
         Args:
             building_type: The type of building to place
@@ -1377,74 +1554,26 @@ class HanBot(BotAI):
             min_distance: Minimum distance from other buildings
             max_distance: Maximum distance from reference position
             addon_space: Whether to reserve space for an addon
-            placement_step: Step size for the placement grid
+            placement_step: Step size for the fallback placement search
             
         Returns:
             A Point2 position or None if no valid position found
         """
-        # Increase min_distance to ensure better spacing between buildings
-        # Original was 5-6, now using 7 by default (allows tanks to move through)
-        
-        # Create a list of potential positions in a spiral pattern
-        positions = []
-        for distance in range(7, max_distance, placement_step):
-            for angle in range(0, 360, 15):  # Check every 20 degrees for more options
-                radians = math.radians(angle)
-                x = near_position.x + (distance * math.cos(radians))
-                y = near_position.y + (distance * math.sin(radians))
-                positions.append(Point2((x, y)))
-
-        # remove positions that are too close to all potential expansion points
-        positions = [pos for pos in positions if all(pos.distance_to(expansion_pos) > 10 for expansion_pos in self.expansion_locations_list)]
-
-        # Shuffle positions for more varied building placement
-        random.shuffle(positions)
-        
-        # Get existing buildings
-        existing_buildings = self.structures.not_flying
-        
-        # For buildings that need addon space, we need extra checking
-        if addon_space:
-            # Check these positions for both building and addon placement
-            for pos in positions:
-                # First check if we can place the building here
-                if await self.can_place(building_type, pos):
-                    # Check distance to other buildings (needs to be larger for better pathing)
-                    if all(building.distance_to(pos) > min_distance for building in existing_buildings):
-                        # Then check if we can place an addon (use supply depot as a proxy for addon size)
-                        addon_pos = Point2((pos.x + 2.5, pos.y - 0.5))
-                        if await self.can_place(UnitTypeId.SUPPLYDEPOT, addon_pos):
-                            # Final check: verify pathing in the surrounding area
-                            # Create a grid of points around the building to check for pathing
-                            path_check_points = []
-                            for x_offset in [-3, 0, 3]:
-                                for y_offset in [-3, 0, 3]:
-                                    if x_offset == 0 and y_offset == 0:
-                                        continue  # Skip the center point (where building will be)
-                                    path_check_points.append(Point2((pos.x + x_offset, pos.y + y_offset)))
-                            
-                            # Check if most of these points are in the pathing grid
-                            valid_path_points = sum(1 for p in path_check_points if self.in_pathing_grid(p))
-                            if valid_path_points >= 6:  # At least 6 of 8 points should be pathable
-                                return pos
-        else:
-            # Regular building (no addon)
-            for pos in positions:
-                if await self.can_place(building_type, pos):
-                    # Check distance to other buildings (needs to be larger for better pathing)
-                    if all(building.distance_to(pos) > min_distance for building in existing_buildings):
-                        # Verify pathing in the surrounding area
-                        path_check_points = []
-                        for x_offset in [-3, 0, 3]:
-                            for y_offset in [-3, 0, 3]:
-                                if x_offset == 0 and y_offset == 0:
-                                    continue  # Skip the center
-                                path_check_points.append(Point2((pos.x + x_offset, pos.y + y_offset)))
-                        
-                        valid_path_points = sum(1 for p in path_check_points if self.in_pathing_grid(p))
-                        if valid_path_points >= 6:
-                            print(f"Found good placement for {building_type} at {pos}")
-                            return pos
+        if self.placement_grid is not None:
+            candidates = self.placement_grid.candidates(
+                near_position,
+                min_radius=7,
+                max_radius=max_distance,
+                addon_space=addon_space,
+                keep_away_from=[building.position for building in self.structures.not_flying],
+                min_distance=min_distance,
+            )
+            if candidates:
+                # One round trip to confirm every candidate at once
+                placeable = await self.can_place(building_type, candidates)
+                for pos, can_place in zip(candidates, placeable):
+                    if can_place:
+                        return pos
         
         # Fall back to standard placement but still with increased min_distance
         return await super().find_placement(building_type, near=near_position, placement_step=placement_step)
@@ -1452,7 +1581,7 @@ class HanBot(BotAI):
     def get_unit_mineral_and_gas_cost(self, unit_type_id: UnitTypeId) -> tuple[int, int]:
         """
         Get the mineral and gas cost of a unit type.
-        Uses game data when possible, falls back to a comprehensive dictionary.
+        Reads the cost table built at game start from game data and the fallback dictionary.
         
         Args:
             unit_type_id: The unit type ID to get costs for
@@ -1460,83 +1589,16 @@ class HanBot(BotAI):
         Returns:
             Tuple of (mineral_cost, gas_cost)
         """
-        # Try to get from game data first
-        try:
-            unit_data = self._game_data.units[unit_type_id.value]
-            if hasattr(unit_data, 'cost'):
-                return (unit_data.cost.minerals, unit_data.cost.vespene)
-        except (KeyError, AttributeError):
-            pass
-        
-        # Comprehensive dictionary of unit costs (mineral, gas)
-        unit_costs = {
-            # Terran
-            UnitTypeId.SCV: (50, 0),
-            UnitTypeId.MARINE: (50, 0),
-            UnitTypeId.MARAUDER: (100, 25),
-            UnitTypeId.REAPER: (50, 50),
-            UnitTypeId.GHOST: (150, 125),
-            UnitTypeId.HELLION: (100, 0),
-            UnitTypeId.HELLIONTANK: (100, 0),
-            UnitTypeId.SIEGETANK: (150, 125),
-            UnitTypeId.SIEGETANKSIEGED: (150, 125),
-            UnitTypeId.CYCLONE: (150, 100),
-            UnitTypeId.WIDOWMINE: (75, 25),
-            UnitTypeId.WIDOWMINEBURROWED: (75, 25),
-            UnitTypeId.THOR: (300, 200),
-            UnitTypeId.THORAP: (300, 200),
-            UnitTypeId.VIKINGFIGHTER: (150, 75),
-            UnitTypeId.VIKINGASSAULT: (150, 75),
-            UnitTypeId.MEDIVAC: (100, 100),
-            UnitTypeId.LIBERATOR: (150, 150),
-            UnitTypeId.LIBERATORAG: (150, 150),
-            UnitTypeId.RAVEN: (100, 200),
-            UnitTypeId.BANSHEE: (150, 100),
-            UnitTypeId.BATTLECRUISER: (400, 300),
-            
-            # Protoss
-            UnitTypeId.PROBE: (50, 0),
-            UnitTypeId.ZEALOT: (100, 0),
-            UnitTypeId.STALKER: (125, 50),
-            UnitTypeId.SENTRY: (50, 100),
-            UnitTypeId.ADEPT: (100, 25),
-            UnitTypeId.HIGHTEMPLAR: (50, 150),
-            UnitTypeId.DARKTEMPLAR: (125, 125),
-            UnitTypeId.IMMORTAL: (275, 100),
-            UnitTypeId.COLOSSUS: (300, 200),
-            UnitTypeId.DISRUPTOR: (150, 150),
-            UnitTypeId.ARCHON: (100, 300),  # Approximation (2 HTs)
-            UnitTypeId.OBSERVER: (25, 75),
-            UnitTypeId.WARPPRISM: (200, 0),
-            UnitTypeId.PHOENIX: (150, 100),
-            UnitTypeId.VOIDRAY: (250, 150),
-            UnitTypeId.ORACLE: (150, 150),
-            UnitTypeId.CARRIER: (350, 250),
-            UnitTypeId.TEMPEST: (250, 175),
-            UnitTypeId.MOTHERSHIP: (400, 400),
-            
-            # Zerg
-            UnitTypeId.DRONE: (50, 0),
-            UnitTypeId.ZERGLING: (25, 0),
-            UnitTypeId.BANELING: (25, 25),  # Plus zergling cost
-            UnitTypeId.ROACH: (75, 25),
-            UnitTypeId.RAVAGER: (75, 75),  # Plus roach cost
-            UnitTypeId.HYDRALISK: (100, 50),
-            UnitTypeId.LURKER: (50, 100),  # Plus hydra cost
-            UnitTypeId.INFESTOR: (100, 150),
-            UnitTypeId.SWARMHOSTMP: (100, 75),
-            UnitTypeId.ULTRALISK: (300, 200),
-            UnitTypeId.OVERLORD: (100, 0),
-            UnitTypeId.OVERSEER: (50, 50),  # Plus overlord cost
-            UnitTypeId.MUTALISK: (100, 100),
-            UnitTypeId.CORRUPTOR: (150, 100),
-            UnitTypeId.BROODLORD: (150, 150),  # Plus corruptor cost
-            UnitTypeId.VIPER: (100, 200),
-        }
-        
-        # Return from dictionary if available, otherwise default to (100, 25)
-        return unit_costs.get(unit_type_id, (100, 25))
+        if unit_type_id.value >= len(self.unit_cost_table):
+            return DEFAULT_UNIT_COST
+        minerals, gas = self.unit_cost_table[unit_type_id.value]
+        return (int(minerals), int(gas))
+
+    def get_army_value(self, units):
+        """Total minerals + gas of a group of units."""
+        return army_value(self.unit_cost_table, units)
 
+    @step_cached
     def get_total_structure_count(self, unit_type):
         """
         Count the total number of a unit type, including ready, flying, and pending structures.
@@ -1548,21 +1610,21 @@ class HanBot(BotAI):
             int: Total count of ready, flying, and pending units/structures
         """
         # Count ready structures
-        ready_count = self.structures(unit_type).ready.amount
+        ready_count = self.army.count(unit_type)
         
         # Count flying buildings (Terran specific)
         flying_count = 0
         if unit_type in {UnitTypeId.COMMANDCENTER, UnitTypeId.ORBITALCOMMAND, UnitTypeId.PLANETARYFORTRESS}:
-            flying_count = self.structures(UnitTypeId.COMMANDCENTERFLYING).amount
+            flying_count = self.army.count(UnitTypeId.COMMANDCENTERFLYING)
         elif unit_type == UnitTypeId.BARRACKS:
-            flying_count = self.structures(UnitTypeId.BARRACKSFLYING).amount
+            flying_count = self.army.count(UnitTypeId.BARRACKSFLYING)
         elif unit_type == UnitTypeId.FACTORY:
-            flying_count = self.structures(UnitTypeId.FACTORYFLYING).amount
+            flying_count = self.army.count(UnitTypeId.FACTORYFLYING)
         elif unit_type == UnitTypeId.STARPORT:
-            flying_count = self.structures(UnitTypeId.STARPORTFLYING).amount
+            flying_count = self.army.count(UnitTypeId.STARPORTFLYING)
         
         # Count pending structures
-        pending_count = self.already_pending(unit_type)
+        pending_count = self.army.pending(unit_type)
         
         # Calculate total
         total_count = ready_count + flying_count + pending_count
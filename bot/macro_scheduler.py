@@ -0,0 +1,81 @@
+from typing import Optional
+
+from sc2.data import race_gas, race_townhalls, race_worker
+from sc2.ids.unit_typeid import UnitTypeId
+
+# config.yml section with the per-controller macro cadence, in steps
+MACRO_CADENCE: str = "MacroCadence"
+# Used for controllers missing from the config section
+DEFAULT_MACRO_CADENCE: dict[str, int] = {
+    "Mining": 1,
+    "AutoSupply": 4,
+    "ProductionController": 4,
+    "SpawnController": 4,
+    "ExpansionController": 22,
+    "GasBuildingController": 22,
+    "BuildWorkers": 4,
+}
+
+TOWNHALL_TYPES: set[UnitTypeId] = set().union(*race_townhalls.values())
+GAS_TYPES: set[UnitTypeId] = set(race_gas.values())
+WORKER_TYPES: set[UnitTypeId] = set(race_worker.values())
+SUPPLY_PROVIDER_TYPES: set[UnitTypeId] = {
+    UnitTypeId.OVERLORD,
+    UnitTypeId.OVERLORDTRANSPORT,
+    UnitTypeId.PYLON,
+    UnitTypeId.SUPPLYDEPOT,
+    UnitTypeId.SUPPLYDEPOTLOWERED,
+}
+
+
+def affected_controllers(type_id: UnitTypeId, is_structure: bool) -> tuple[str, ...]:
+    """
+    Macro controllers whose decision changes when one of our units or structures
+    of `type_id` is added or lost; army units affect none of them.
+    """
+    if type_id in TOWNHALL_TYPES:
+        return ("AutoSupply", "ExpansionController", "GasBuildingController", "BuildWorkers")
+    if type_id in SUPPLY_PROVIDER_TYPES:
+        return ("AutoSupply", "SpawnController")
+    if type_id in GAS_TYPES:
+        return ("GasBuildingController",)
+    if type_id in WORKER_TYPES:
+        return ("BuildWorkers",)
+    if is_structure:
+        return ("ProductionController", "SpawnController")
+    return ()
+
+
+class MacroScheduler:
+    """
+    Decides which macro controllers a bot registers on a given step.
+
+    Each controller runs every `cadence` steps instead of every step, since most of
+    them reach the same decision frame after frame. `trigger` makes controllers due
+    on the next call to `due` regardless of cadence, so events such as a building
+    finishing are still reacted to at once by the controllers they affect, see
+    `affected_controllers`.
+    """
+
+    def __init__(self, cadences: Optional[dict[str, int]] = None, default_cadence: int = 1):
+        """
+        Args:
+            cadences: Steps between runs per controller name, on top of `DEFAULT_MACRO_CADENCE`
+            default_cadence: Steps between runs of controllers not listed anywhere
+        """
+        self.cadences: dict[str, int] = {**DEFAULT_MACRO_CADENCE, **(cadences or {})}
+        self.default_cadence = default_cadence
+        self._last_run: dict[str, int] = {}
+
+    def due(self, name: str, iteration: int) -> bool:
+        """Whether controller `name` runs this step; counts as a run when True."""
+        last_run = self._last_run.get(name)
+        if last_run is not None and iteration - last_run < self.cadences.get(name, self.default_cadence):
+            return False
+        self._last_run[name] = iteration
+        return True
+
+    def trigger(self, *names: str) -> None:
+        """Make controllers `names` due right away."""
+        for name in names:
+            self._last_run.pop(name, None)
@@ -0,0 +1,201 @@
+"""
+Index of the local maps directory and a cache of per-map static data.
+
+`MapIndex` records every map's name, path, size and content hash in a small JSON
+file, rebuilt only when the directory (or a subdirectory) changed since, and when
+it is, only files whose size or mtime changed are hashed again. Maps are picked
+from a weighted pool, see `MapIndex.pick`.
+
+Static map data that bots derive at game start is stored per content hash as
+compressed npz under `MAP_STATIC_DIRECTORY`, see `load_static_data`, or per
+content hash and spawn when it depends on the spawn, see `spawn_key`. Parallel
+games share these files, so they are written to a temporary file and renamed
+into place, and a file that cannot be read counts as missing.
+"""
+import hashlib
+import json
+import os
+import random
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Environment variable overriding the maps directory python-sc2 would use
+MAPS_PATH_ENV: str = "SC2_MAPS_PATH"
+MAP_FILE_EXT: str = "SC2Map"
+# Anchored to the repository, so games started from any directory share them
+ROOT_DIRECTORY: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAP_INDEX_PATH: str = os.path.join(ROOT_DIRECTORY, "data", "map_index.json")
+MAP_STATIC_DIRECTORY: str = os.path.join(ROOT_DIRECTORY, "data", "map_static")
+
+
+def maps_directory() -> Optional[Path]:
+    """`SC2_MAPS_PATH` if set, else python-sc2's maps directory of the local install, None without one."""
+    if MAPS_PATH_ENV in os.environ:
+        return Path(os.environ[MAPS_PATH_ENV]).expanduser()
+    from sc2.paths import Paths
+
+    try:
+        return Path(Paths.MAPS)
+    except SystemExit:
+        # python-sc2 exits when StarCraft II is not installed, there are no local maps then
+        return None
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, write) -> None:
+    """Call `write(file)` on a temporary file next to `path`, then rename it to `path`."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # unique per process, the games sharing the file run in separate processes
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, "wb") as file:
+            write(file)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.unlink(temporary_path)
+        raise
+
+
+def _directory_mtimes(directory: Path) -> dict[str, int]:
+    """mtime of `directory` and every subdirectory, adding or removing a map changes one of them."""
+    mtimes = {}
+    for root, _, _ in os.walk(directory):
+        mtimes[root] = os.stat(root).st_mtime_ns
+    return mtimes
+
+
+class MapIndex:
+    """
+    Maps found under a directory, from the index file when it is still valid.
+
+    Each entry holds the map's path, size, mtime and content hash, by map name
+    (the file name without extension).
+    """
+
+    def __init__(self, directory: Optional[Path] = None, index_path: str = MAP_INDEX_PATH):
+        self.directory = Path(directory) if directory is not None else maps_directory()
+        self.index_path = index_path
+        self.maps: dict[str, dict] = {}
+        self.rebuilt = False
+        self._load()
+
+    def _load(self) -> None:
+        cached = {}
+        if os.path.isfile(self.index_path):
+            with open(self.index_path) as index_file:
+                cached = json.load(index_file)
+        if self.directory is None or not self.directory.is_dir():
+            return
+        mtimes = _directory_mtimes(self.directory)
+        if cached.get("directory") == str(self.directory) and cached.get("mtimes") == mtimes:
+            self.maps = cached["maps"]
+            return
+
+        previous = cached.get("maps", {}) if cached.get("directory") == str(self.directory) else {}
+        maps = {}
+        for map_path in sorted(self.directory.rglob(f"*.{MAP_FILE_EXT}")):
+            if not map_path.is_file():
+                continue
+            stat = map_path.stat()
+            entry = previous.get(map_path.stem)
+            if not (
+                entry
+                and entry["path"] == str(map_path)
+                and entry["size"] == stat.st_size
+                and entry["mtime"] == stat.st_mtime_ns
+            ):
+                entry = {
+                    "path": str(map_path),
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime_ns,
+                    "hash": _file_hash(map_path),
+                }
+            maps[map_path.stem] = entry
+        self.maps = maps
+        self.rebuilt = True
+        index = {"directory": str(self.directory), "mtimes": mtimes, "maps": maps}
+        _write_atomic(self.index_path, lambda file: file.write(json.dumps(index).encode()))
+
+    def names(self) -> list[str]:
+        return list(self.maps)
+
+    def content_hash(self, name_or_path: str) -> Optional[str]:
+        """Content hash of a map given by name or by a path ending in its file name."""
+        entry = self.maps.get(Path(name_or_path).stem)
+        return entry["hash"] if entry else None
+
+    def pick(self, rng: random.Random, weights: Optional[dict[str, float]] = None, count: int = 1) -> list[str]:
+        """
+        Draw `count` map names, with replacement.
+
+        Args:
+            rng: Random source
+            weights: Relative weight per map name; unlisted maps weigh 1, weight 0 excludes a map
+            count: Maps to draw
+        """
+        weights = weights or {}
+        names = [name for name in self.maps if weights.get(name, 1.0) > 0]
+        if not names:
+            return []
+        return rng.choices(names, weights=[weights.get(name, 1.0) for name in names], k=count)
+
+
+def indexed_content_hash(map_path: str, index_path: str = MAP_INDEX_PATH) -> Optional[str]:
+    """
+    Content hash of a map as recorded in the index file, None when it is not indexed.
+
+    Only reads the index file, the maps directory is not checked, so this is cheap
+    enough for game start and works where there is no index at all (ladder).
+    """
+    if not map_path or not os.path.isfile(index_path):
+        return None
+    with open(index_path) as index_file:
+        entry = json.load(index_file).get("maps", {}).get(Path(map_path).stem)
+    return entry["hash"] if entry else None
+
+
+def spawn_key(content_hash: Optional[str], start_location) -> Optional[str]:
+    """
+    Key for static data that depends on where the bot spawned, such as the game
+    start grids that include its townhall; used in place of the content hash.
+    """
+    if content_hash is None:
+        return None
+    return f"{content_hash}-{int(start_location[0])}-{int(start_location[1])}"
+
+
+def static_data_path(content_hash: str, directory: str = MAP_STATIC_DIRECTORY) -> str:
+    return os.path.join(directory, f"{content_hash}.npz")
+
+
+def load_static_data(
+    content_hash: Optional[str], directory: str = MAP_STATIC_DIRECTORY
+) -> Optional[dict[str, np.ndarray]]:
+    """Static data saved for the map with `content_hash`, None when there is none or it cannot be read."""
+    if content_hash is None:
+        return None
+    try:
+        with np.load(static_data_path(content_hash, directory)) as data:
+            return dict(data)
+    except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+        # missing, or damaged by a write that did not finish, recompute it
+        return None
+
+
+def save_static_data(content_hash: Optional[str], directory: str = MAP_STATIC_DIRECTORY, **arrays: np.ndarray) -> None:
+    """Save `arrays` for the map with `content_hash`, readers never see a partly written file."""
+    if content_hash is None:
+        return
+    _write_atomic(static_data_path(content_hash, directory), lambda file: np.savez_compressed(file, **arrays))
@@ -0,0 +1,211 @@
+import random
+
+import numpy as np
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.position import Point2
+
+# Production buildings whose addon footprint is reserved together with the building
+ADDON_BUILDINGS = {UnitTypeId.BARRACKS, UnitTypeId.FACTORY, UnitTypeId.STARPORT}
+
+# Points around a slot that are checked for pathing, relative to the slot's center cell
+PATH_CHECK_OFFSETS = [(dx, dy) for dx in (-3, 0, 3) for dy in (-3, 0, 3) if (dx, dy) != (0, 0)]
+MIN_PATHABLE_POINTS = 6  # At least 6 of 8 points around a building should stay pathable
+# Cells beyond a slot center that its footprint, addon and path check points can reach
+SLOT_MARGIN = 4
+# Slot state that only depends on the map, see `PlacementGrid.static_arrays`
+STATIC_PLACEMENT_ARRAYS = ("blocked", "reserved", "slots", "slots_with_addon")
+
+
+def _box_sums(integral, x0, y0, width, height, xs, ys):
+    """Sum of each width x height box whose lower-left cell is (xs + x0, ys + y0)."""
+    x_lo = xs + x0
+    y_lo = ys + y0
+    x_hi = x_lo + width
+    y_hi = y_lo + height
+    return (
+        integral[y_hi, x_hi] - integral[y_lo, x_hi] - integral[y_hi, x_lo] + integral[y_lo, x_lo]
+    )
+
+
+class PlacementGrid:
+    """
+    Precomputed 3x3 building slots, optionally with room for a 2x2 addon.
+
+    A slot is identified by its center cell (cx, cy); the building is placed at
+    (cx + 0.5, cy + 0.5), covering cells cx-1..cx+1 / cy-1..cy+1, and its addon
+    covers cells cx+2..cx+3 / cy-1..cy. Slot validity is computed once for the whole
+    map from the static placement and pathing grids, then updated locally whenever a
+    structure footprint is added or removed, so placement requests are answered
+    without talking to the game client.
+
+    Grids are indexed [y, x] like `PixelMap.data_numpy`.
+    """
+
+    def __init__(
+        self, placement_grid, pathing_grid, expansion_locations, expansion_clearance=10, static_arrays=None
+    ):
+        """
+        Args:
+            placement_grid: (height, width) array, nonzero where buildings can be placed
+            pathing_grid: (height, width) array, nonzero where ground units can walk
+            expansion_locations: Points that must stay clear for future townhalls
+            expansion_clearance: Slots closer than this to an expansion location are never used
+            static_arrays: `static_arrays()` of a grid for the same map; restored instead of
+                computing the slots, call `track` with the units that were added to it
+        """
+        self.placeable = np.asarray(placement_grid) != 0
+        self.pathable = np.asarray(pathing_grid) != 0
+        self.height, self.width = self.placeable.shape
+        self.blocked = np.zeros(self.placeable.shape, dtype=np.int16)
+        self.footprints = {}  # tag -> list of (x0, y0, x1, y1) cell rectangles
+        self.slots = np.zeros(self.placeable.shape, dtype=bool)
+        self.slots_with_addon = np.zeros(self.placeable.shape, dtype=bool)
+        self.reserved = np.zeros(self.placeable.shape, dtype=bool)
+        if static_arrays is not None:
+            for name, array in static_arrays.items():
+                getattr(self, name)[...] = array
+            return
+
+        # Cells too close to an expansion location never hold a slot
+        ys, xs = np.mgrid[0 : self.height, 0 : self.width]
+        for location in expansion_locations:
+            self.reserved |= (xs + 0.5 - location[0]) ** 2 + (ys + 0.5 - location[1]) ** 2 <= (
+                expansion_clearance**2
+            )
+
+        self._refresh(0, 0, self.width, self.height)
+
+    def _refresh(self, x0, y0, x1, y1):
+        """Recompute slot validity for slot centers in [x0, x1) x [y0, y1)."""
+        # Slot centers need the building, addon and path check points inside the map
+        x0, y0 = max(x0, 3), max(y0, 3)
+        x1, y1 = min(x1, self.width - 3), min(y1, self.height - 3)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        # Only the cells these slots can reach are read, so updates cost O(window), not O(map)
+        wx0, wy0 = max(x0 - SLOT_MARGIN, 0), max(y0 - SLOT_MARGIN, 0)
+        wx1, wy1 = min(x1 + SLOT_MARGIN, self.width), min(y1 + SLOT_MARGIN, self.height)
+        open_cells = self.blocked[wy0:wy1, wx0:wx1] == 0
+        free = self.placeable[wy0:wy1, wx0:wx1] & open_cells
+        walkable = self.pathable[wy0:wy1, wx0:wx1] & open_cells
+        integral = np.zeros((wy1 - wy0 + 1, wx1 - wx0 + 1), dtype=np.int32)
+        integral[1:, 1:] = free.cumsum(axis=0).cumsum(axis=1)
+
+        # Slot centers in window coordinates
+        ys, xs = np.mgrid[y0 - wy0 : y1 - wy0, x0 - wx0 : x1 - wx0]
+        building_free = _box_sums(integral, -1, -1, 3, 3, xs, ys) == 9
+        addon_free = _box_sums(integral, 2, -1, 2, 2, xs, ys) == 4
+        path_points = sum(walkable[ys + dy, xs + dx].astype(np.int8) for dx, dy in PATH_CHECK_OFFSETS)
+
+        base = building_free & (path_points >= MIN_PATHABLE_POINTS) & ~self.reserved[y0:y1, x0:x1]
+        self.slots[y0:y1, x0:x1] = base
+        self.slots_with_addon[y0:y1, x0:x1] = base & addon_free
+
+    def _update(self, rects, delta):
+        for rx0, ry0, rx1, ry1 in rects:
+            self.blocked[ry0:ry1, rx0:rx1] += delta
+        # Any slot whose footprint or path check points touch a changed cell may flip
+        x0 = min(r[0] for r in rects) - SLOT_MARGIN
+        y0 = min(r[1] for r in rects) - SLOT_MARGIN
+        x1 = max(r[2] for r in rects) + SLOT_MARGIN
+        y1 = max(r[3] for r in rects) + SLOT_MARGIN
+        self._refresh(x0, y0, x1, y1)
+
+    def _rect(self, center, half_width, half_height):
+        x0 = max(int(round(center[0] - half_width)), 0)
+        y0 = max(int(round(center[1] - half_height)), 0)
+        x1 = min(int(round(center[0] + half_width)), self.width)
+        y1 = min(int(round(center[1] + half_height)), self.height)
+        return x0, y0, x1, y1
+
+    def footprint(self, unit):
+        """Cell rectangles covered by a structure or resource, including a reserved addon."""
+        if unit.is_mineral_field:
+            return [self._rect(unit.position, 1, 0.5)]
+        radius = unit.footprint_radius
+        if radius is None:
+            radius = 1.5 if unit.is_vespene_geyser else unit.radius
+        rects = [self._rect(unit.position, radius, radius)]
+        if unit.type_id in ADDON_BUILDINGS:
+            rects.append(self._rect(unit.position.offset((2.5, -0.5)), 1, 1))
+        return rects
+
+    def add(self, unit):
+        """Mark the footprint of a structure or resource as blocked."""
+        if unit.tag in self.footprints:
+            return
+        rects = self.footprint(unit)
+        self.footprints[unit.tag] = rects
+        self._update(rects, 1)
+
+    def add_all(self, units):
+        """`add` for many units with a single slot refresh, e.g. the resources at game start."""
+        rects = []
+        for unit in units:
+            if unit.tag not in self.footprints:
+                self.footprints[unit.tag] = self.footprint(unit)
+                rects.extend(self.footprints[unit.tag])
+        if rects:
+            self._update(rects, 1)
+
+    def static_arrays(self):
+        """Slot state to cache for the map, passed back to the constructor as `static_arrays`."""
+        return {name: getattr(self, name) for name in STATIC_PLACEMENT_ARRAYS}
+
+    def track(self, units):
+        """Track the footprints of units already blocked in restored `static_arrays`, so they can be removed."""
+        for unit in units:
+            self.footprints[unit.tag] = self.footprint(unit)
+
+    def remove(self, tag):
+        """Free the footprint of a structure that died, lifted off or was mined out."""
+        rects = self.footprints.pop(tag, None)
+        if rects:
+            self._update(rects, -1)
+
+    def candidates(
+        self,
+        near,
+        min_radius=7,
+        max_radius=30,
+        addon_space=False,
+        keep_away_from=(),
+        min_distance=0,
+        limit=8,
+    ):
+        """
+        Valid slot positions in a ring around `near`, in random order.
+
+        Args:
+            near: Center of the search ring
+            min_radius: Minimum distance from `near`
+            max_radius: Maximum distance from `near`
+            addon_space: Whether the slot must leave room for an addon
+            keep_away_from: Positions (e.g. existing structures) the slot must be further than `min_distance` from
+            min_distance: Minimum distance to every position in `keep_away_from`
+            limit: Maximum number of positions to return
+
+        Returns:
+            list of Point2
+        """
+        mask = self.slots_with_addon if addon_space else self.slots
+        x0 = max(int(near[0] - max_radius), 0)
+        y0 = max(int(near[1] - max_radius), 0)
+        x1 = min(int(near[0] + max_radius) + 1, self.width)
+        y1 = min(int(near[1] + max_radius) + 1, self.height)
+        ys, xs = np.nonzero(mask[y0:y1, x0:x1])
+        points = np.column_stack((xs + x0 + 0.5, ys + y0 + 0.5))
+
+        distance = np.hypot(points[:, 0] - near[0], points[:, 1] - near[1])
+        points = points[(distance >= min_radius) & (distance < max_radius)]
+
+        keep_away = np.array([(p[0], p[1]) for p in keep_away_from], dtype=float).reshape(-1, 2)
+        if len(points) and len(keep_away) and min_distance > 0:
+            deltas = points[:, np.newaxis, :] - keep_away[np.newaxis, :, :]
+            clear = (np.einsum("ijk,ijk->ij", deltas, deltas) > min_distance**2).all(axis=1)
+            points = points[clear]
+
+        # Random order for more varied building placement
+        chosen = random.sample(range(len(points)), min(limit, len(points)))
+        return [Point2((float(points[i, 0]), float(points[i, 1]))) for i in chosen]
@@ -0,0 +1,170 @@
+"""
+Opt-in tracer for the requests a bot makes to the game over the sc2api websocket.
+
+`TracingClient` is a drop-in `sc2.client.Client` that appends one fixed-size record
+per request to a binary trace file: request kind, start time, serialize time,
+round trip, parse time and payload sizes. Serialize time runs from the request
+call to the websocket send, the round trip from the send to the response being
+received, parse time from there until the call returns. The gaps between requests
+are the bot's own compute, see `scripts/protocol_report.py`.
+
+Ladder games pass a trace path to `ladder.LadderConnection`; local games run
+`run_game` inside `traced_clients`, which swaps the `Client` that `sc2.main`
+creates for every player.
+"""
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import sc2.main
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2.client import Client
+
+TRACE_MAGIC = b"SC2TRACE1"
+# kind, start, serialize, round trip, parse (s), request bytes, response bytes
+TRACE_RECORD = np.dtype(
+    [
+        ("kind", "u1"),
+        ("start", "<f8"),
+        ("serialize", "<f4"),
+        ("round_trip", "<f4"),
+        ("parse", "<f4"),
+        ("request_bytes", "<u4"),
+        ("response_bytes", "<u4"),
+    ]
+)
+# Request kinds are stored as their field number in sc_pb.Request
+REQUEST_KINDS: dict[str, int] = {
+    field.name: field.number for field in sc_pb.Request.DESCRIPTOR.oneofs_by_name["request"].fields
+}
+REQUEST_NAMES: dict[int, str] = {number: name for name, number in REQUEST_KINDS.items()}
+
+
+class ProtocolTrace:
+    """Buffered writer of trace records, times are relative to its creation."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(TRACE_MAGIC)
+        self._origin = time.perf_counter()
+        self._record = np.zeros(1, dtype=TRACE_RECORD)
+
+    def write(
+        self,
+        kind: str,
+        start: float,
+        serialize: float,
+        round_trip: float,
+        parse: float,
+        request_bytes: int,
+        response_bytes: int,
+    ) -> None:
+        record = self._record
+        record["kind"] = REQUEST_KINDS.get(kind, 0)
+        record["start"] = start - self._origin
+        record["serialize"] = serialize
+        record["round_trip"] = round_trip
+        record["parse"] = parse
+        record["request_bytes"] = request_bytes
+        record["response_bytes"] = response_bytes
+        self._file.write(record.tobytes())
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_trace(path: str) -> np.ndarray:
+    """All records of a trace file as a structured array of `TRACE_RECORD`."""
+    with open(path, "rb") as file:
+        if file.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a protocol trace")
+        return np.frombuffer(file.read(), dtype=TRACE_RECORD)
+
+
+class _TimedSocket:
+    """Websocket pass-through noting when the last request went out and its response came in."""
+
+    def __init__(self, ws):
+        self._ws = ws
+        self.sent_at: float = 0.0
+        self.received_at: float = 0.0
+        self.request_bytes: int = 0
+        self.response_bytes: int = 0
+
+    async def send_bytes(self, data: bytes, *args, **kwargs) -> None:
+        self.request_bytes = len(data)
+        self.sent_at = time.perf_counter()
+        await self._ws.send_bytes(data, *args, **kwargs)
+
+    async def receive_bytes(self, *args, **kwargs) -> bytes:
+        data = await self._ws.receive_bytes(*args, **kwargs)
+        self.received_at = time.perf_counter()
+        self.response_bytes = len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+
+class TracingClient(Client):
+    """`Client` that writes a trace record for every request it makes."""
+
+    def __init__(self, ws, *args, trace: ProtocolTrace, **kwargs):
+        self._socket = _TimedSocket(ws)
+        self.trace = trace
+        super().__init__(self._socket, *args, **kwargs)
+
+    async def _execute(self, **kwargs):
+        start = time.perf_counter()
+        response = await super()._execute(**kwargs)
+        end = time.perf_counter()
+        socket = self._socket
+        self.trace.write(
+            next(iter(kwargs)),
+            start,
+            socket.sent_at - start,
+            socket.received_at - socket.sent_at,
+            end - socket.received_at,
+            socket.request_bytes,
+            socket.response_bytes,
+        )
+        return response
+
+
+def trace_path(path: str, index: int) -> str:
+    """Trace file of the `index`-th client: `path` itself, then `name-1.ext`, ..."""
+    if index == 0:
+        return path
+    file = Path(path)
+    return str(file.with_name(f"{file.stem}-{index}{file.suffix}"))
+
+
+@contextmanager
+def traced_clients(path: Optional[str]):
+    """
+    Trace every client `sc2.main` creates inside the block, one file per client.
+
+    Does nothing when `path` is None, so callers can pass an optional setting through.
+    """
+    if path is None:
+        yield
+        return
+    traces: list[ProtocolTrace] = []
+
+    def make_client(ws, *args, **kwargs) -> TracingClient:
+        trace = ProtocolTrace(trace_path(path, len(traces)))
+        traces.append(trace)
+        return TracingClient(ws, *args, trace=trace, **kwargs)
+
+    original = sc2.main.Client
+    sc2.main.Client = make_client
+    try:
+        yield
+    finally:
+        sc2.main.Client = original
+        for trace in traces:
+            trace.close()
@@ -1,4 +1,3 @@
-from itertools import cycle
 from typing import Optional
 
 import numpy as np
@@ -8,7 +7,6 @@ from ares.behaviors.combat import CombatManeuver
 from ares.behaviors.combat.individual import (
     AMove,
     KeepUnitSafe,
-    PathUnitToTarget,
     ShootTargetInRange,
     StutterUnitBack,
     UseAbility,
@@ -18,7 +16,7 @@ from sc2.data import Race
 from sc2.ids.unit_typeid import UnitTypeId as UnitID
 from sc2.position import Point2
 from ares.consts import ALL_STRUCTURES, WORKER_TYPES, UnitRole, UnitTreeQueryType
-from cython_extensions import cy_closest_to, cy_in_attack_range, cy_pick_enemy_target
+from cython_extensions import cy_in_attack_range, cy_pick_enemy_target
 from sc2.data import Race
 from sc2.ids.ability_id import AbilityId
 from sc2.ids.unit_typeid import UnitTypeId as UnitID
@@ -27,6 +25,13 @@ from sc2.position import Point2
 from sc2.unit import Unit
 from sc2.units import Units
 
+from bot.attack_target import AttackTargetCache
+from bot.enemy_filter import EnemyClassifier
+from bot.flow_field import FLOW_FIELD_ARRIVAL_DISTANCE, RouteCache
+from bot.grid_tracker import GridTracker
+from bot.macro_scheduler import MACRO_CADENCE, MacroScheduler, affected_controllers
+from bot.squad_micro import SQUAD_MICRO, SquadPlanner, needs_own_maneuver
+
 COMMON_UNIT_IGNORE_TYPES: set[UnitID] = {
     UnitID.EGG,
     UnitID.LARVA,
@@ -62,9 +67,8 @@ ARMY_COMPS: dict[Race, dict] = {
 
 # Mostly copied from https://github.com/AresSC2/ares-random-example/blob/main/bot/main.py
 class QinBot(AresBot):
-    expansions_generator: cycle
-    current_base_target: Point2
     _begin_attack_at_supply: float
+    macro_scheduler: MacroScheduler
 
     def __init__(self, game_step_override: Optional[int] = None):
         """Initiate custom bot
@@ -78,23 +82,18 @@ class QinBot(AresBot):
         super().__init__(game_step_override)
 
         self._commenced_attack: bool = False
+        self.attack_targets: AttackTargetCache = AttackTargetCache()
+        # versioned view of the ground grid, see `_micro`
+        self.ground_grid_tracker: GridTracker = GridTracker()
+        # idle units follow routes from one shared flow field per attack target
+        self.routes: RouteCache = RouteCache(self.ground_grid_tracker)
 
     @property
     def attack_target(self) -> Point2:
-        if self.enemy_structures:
-            # using a faster cython alternative here, see docs for all available functions
-            # https://aressc2.github.io/ares-sc2/api_reference/cython_extensions/index.html
-            return cy_closest_to(self.start_location, self.enemy_structures).position
-        # not seen anything in early game, just head to enemy spawn
-        elif self.time < 240.0:
-            return self.enemy_start_locations[0]
-        # else search the map
-        else:
-            # cycle through expansion locations
-            if self.is_visible(self.current_base_target):
-                self.current_base_target = next(self.expansions_generator)
-
-            return self.current_base_target
+        # closest known enemy structure, else enemy spawn early on, else search
+        # expansions; only recomputed when the enemy structure set changes or the
+        # current search target comes into vision, see `AttackTargetCache`
+        return self.attack_targets.target(self)
 
     async def on_start(self) -> None:
         """
@@ -103,19 +102,22 @@ class QinBot(AresBot):
         """
         await super(QinBot, self).on_start()
 
-        self.current_base_target = self.enemy_start_locations[0]
-        self.expansions_generator = cycle(
-            [pos for pos in self.expansion_locations_list]
+        self.attack_targets.reset(
+            self.start_location,
+            self.enemy_start_locations[0],
+            self.expansion_locations_list,
         )
         self._begin_attack_at_supply = 3.0 if self.race == Race.Terran else 6.0
+        # each macro controller runs at its own cadence, see `MacroCadence` in config.yml
+        self.macro_scheduler = MacroScheduler(self.config.get(MACRO_CADENCE, {}))
 
     async def on_step(self, iteration: int) -> None:
         await super(QinBot, self).on_step(iteration)
 
-        self._macro()
+        self._macro(iteration)
 
         if iteration > 2 * 22.4 * 60: # 2 minutes
-            self._macro_expansion()
+            self._macro_expansion(iteration)
 
         # https://aressc2.github.io/ares-sc2/api_reference/manager_mediator.html#ares.managers.manager_mediator.ManagerMediator.get_units_from_role
         # see `self.on_unit_created` where we originally assigned units ATTACKING role
@@ -143,30 +145,62 @@ class QinBot(AresBot):
             # See https://aressc2.github.io/ares-sc2/api_reference/manager_mediator.html
             self.mediator.assign_role(tag=unit.tag, role=UnitRole.ATTACKING)
 
-    def _macro(self) -> None:
-        self.register_behavior(Mining())
+        # new supply (overlords), re-evaluate the controllers it affects this step;
+        # workers and army units are left to the cadence, they are created constantly
+        if unit.type_id not in WORKER_TYPES:
+            self.macro_scheduler.trigger(*affected_controllers(unit.type_id, False))
+
+    async def on_building_construction_complete(self, unit: Unit) -> None:
+        await super(QinBot, self).on_building_construction_complete(unit)
+
+        self.macro_scheduler.trigger(*affected_controllers(unit.type_id, True))
+
+    async def on_unit_destroyed(self, unit_tag: int) -> None:
+        # only our own losses change what macro should do, and army losses are
+        # left to the cadence, units die constantly in fights
+        if lost := self._units_previous_map.get(unit_tag):
+            self.macro_scheduler.trigger(*affected_controllers(lost.type_id, False))
+        elif lost := self._structures_previous_map.get(unit_tag):
+            self.macro_scheduler.trigger(*affected_controllers(lost.type_id, True))
+
+        await super(QinBot, self).on_unit_destroyed(unit_tag)
+
+        self.routes.release(unit_tag)
+
+    def _macro(self, iteration: int) -> None:
+        macro: MacroScheduler = self.macro_scheduler
+
+        if macro.due("Mining", iteration):
+            self.register_behavior(Mining())
 
-        if self.build_order_runner.build_completed:
+        if self.build_order_runner.build_completed and macro.due("AutoSupply", iteration):
             self.register_behavior(AutoSupply(base_location=self.start_location))
 
-        self.register_behavior(
-            ProductionController(ARMY_COMPS[self.race], self.start_location)
-        )
-        self.register_behavior(SpawnController(ARMY_COMPS[self.race]))
+        if macro.due("ProductionController", iteration):
+            self.register_behavior(
+                ProductionController(ARMY_COMPS[self.race], self.start_location)
+            )
+        if macro.due("SpawnController", iteration):
+            self.register_behavior(SpawnController(ARMY_COMPS[self.race]))
 
-    def _macro_expansion(self) -> None:
-        self.register_behavior(
-            ExpansionController(to_count=6, can_afford_check = False, max_pending=2)
-        )
+    def _macro_expansion(self, iteration: int) -> None:
+        macro: MacroScheduler = self.macro_scheduler
 
-        self.register_behavior(
-            GasBuildingController(to_count=len(self.townhalls)*1.5)
-        )
+        if macro.due("ExpansionController", iteration):
+            self.register_behavior(
+                ExpansionController(to_count=6, can_afford_check = False, max_pending=2)
+            )
+
+        if macro.due("GasBuildingController", iteration):
+            self.register_behavior(
+                GasBuildingController(to_count=len(self.townhalls)*1.5)
+            )
 
         # Need to build workers when expanding
-        self.register_behavior(
-            BuildWorkers(to_count=70)
-        )
+        if macro.due("BuildWorkers", iteration):
+            self.register_behavior(
+                BuildWorkers(to_count=70)
+            )
 
     def _micro(self, forces: Units) -> None:
         # make a fast batch distance query to enemy units for all our units
@@ -187,11 +221,24 @@ class QinBot(AresBot):
 
         # get a ground grid to path on, this already contains enemy influence
         grid: np.ndarray = self.mediator.get_ground_grid
+        # note which cells changed since last step, so routes whose cells did not
+        # change are reused instead of re-planned
+        self.ground_grid_tracker.update(grid, self.state.game_loop)
 
         # make a single call to self.attack_target property
         # otherwise it keep calculating for every unit
         target: Point2 = self.attack_target
 
+        # classify every enemy once, nearby groups of neighbouring units overlap
+        enemy_classifier: EnemyClassifier = EnemyClassifier(
+            COMMON_UNIT_IGNORE_TYPES, ALL_STRUCTURES
+        )
+
+        # units with nothing in weapon range share squad maneuvers, see `SquadPlanner`
+        squads: Optional[SquadPlanner] = (
+            SquadPlanner() if self.config.get(SQUAD_MICRO, False) else None
+        )
+
         # use `ares-sc2` combat maneuver system
         # https://aressc2.github.io/ares-sc2/api_reference/behaviors/combat_behaviors.html
         for unit in forces:
@@ -201,14 +248,17 @@ class QinBot(AresBot):
             then all other behaviors will be ignored for this step.
             """
 
-            attacking_maneuver: CombatManeuver = CombatManeuver()
             # we already calculated close enemies, use unit tag to retrieve them
-            all_close: Units = near_enemy[unit.tag].filter(
-                lambda u: not u.is_memory and u.type_id not in COMMON_UNIT_IGNORE_TYPES
-            )
-            only_enemy_units: Units = all_close.filter(
-                lambda u: u.type_id not in ALL_STRUCTURES
-            )
+            # and separate enemy units from enemy structures in the same pass
+            all_close, only_enemy_units = enemy_classifier.split(near_enemy[unit.tag])
+            if (
+                squads is not None
+                and not needs_own_maneuver(unit, self.race)
+                and squads.assign(unit, all_close)
+            ):
+                continue
+
+            attacking_maneuver: CombatManeuver = CombatManeuver()
 
             if self.race == Race.Zerg:
                 # you can add a CombatManeuver to another CombatManeuver!!!
@@ -247,11 +297,23 @@ class QinBot(AresBot):
 
             # no enemy around, path to the attack target
             else:
-                attacking_maneuver.add(
-                    PathUnitToTarget(unit=unit, grid=grid, target=target)
+                # idle units share one flow field towards `target` and keep their
+                # route until the grid changes along it, see `RouteCache`
+                waypoint: Optional[Point2] = self.routes.waypoint(
+                    unit.tag, unit.position, grid, target
                 )
+                if (
+                    waypoint is not None
+                    and unit.distance_to(target) > FLOW_FIELD_ARRIVAL_DISTANCE
+                ):
+                    attacking_maneuver.add(
+                        UseAbility(ability=AbilityId.MOVE_MOVE, unit=unit, target=waypoint)
+                    )
                 attacking_maneuver.add(AMove(unit=unit, target=target))
 
             # DON'T FORGET TO REGISTER OUR COMBAT MANEUVER!!
             self.register_behavior(attacking_maneuver)
 
+        if squads is not None:
+            squads.register(self, grid, target)
+
@@ -10,7 +10,6 @@ software engineering principles may be necessary.
 """
 
 
-from itertools import cycle
 from typing import Optional
 
 import numpy as np
@@ -19,7 +18,6 @@ from ares.behaviors.combat import CombatManeuver
 from ares.behaviors.combat.individual import (
     AMove,
     KeepUnitSafe,
-    PathUnitToTarget,
     ShootTargetInRange,
     StutterUnitBack,
     UseAbility,
@@ -27,7 +25,7 @@ from ares.behaviors.combat.individual import (
 from ares.behaviors.macro import AutoSupply, Mining, SpawnController
 from ares.behaviors.macro.macro_plan import MacroPlan
 from ares.consts import ALL_STRUCTURES, WORKER_TYPES, UnitRole, UnitTreeQueryType
-from cython_extensions import cy_closest_to, cy_in_attack_range, cy_pick_enemy_target
+from cython_extensions import cy_in_attack_range, cy_pick_enemy_target
 from sc2.data import Race
 from sc2.ids.ability_id import AbilityId
 from sc2.ids.unit_typeid import UnitTypeId as UnitID
@@ -36,6 +34,12 @@ from sc2.position import Point2
 from sc2.unit import Unit
 from sc2.units import Units
 
+from bot.attack_target import AttackTargetCache
+from bot.enemy_filter import EnemyClassifier
+from bot.flow_field import FLOW_FIELD_ARRIVAL_DISTANCE, RouteCache
+from bot.grid_tracker import GridTracker
+from bot.squad_micro import SQUAD_MICRO, SquadPlanner, needs_own_maneuver
+
 # this will be used for ares SpawnController behavior
 ARMY_COMPS: dict[Race, dict] = {
     Race.Protoss: {
@@ -67,8 +71,6 @@ COMMON_UNIT_IGNORE_TYPES: set[UnitID] = {
 
 
 class MyBot(AresBot):
-    expansions_generator: cycle
-    current_base_target: Point2
     _begin_attack_at_supply: float
     BURROW_AT_HEALTH_PERC: float = 0.3
     UNBURROW_AT_HEALTH_PERC: float = 0.9
@@ -85,25 +87,18 @@ class MyBot(AresBot):
         super().__init__(game_step_override)
 
         self._commenced_attack: bool = False
+        self.attack_targets: AttackTargetCache = AttackTargetCache()
+        # versioned view of the ground grid, see `_micro`
+        self.ground_grid_tracker: GridTracker = GridTracker()
+        # idle units follow routes from one shared flow field per attack target
+        self.routes: RouteCache = RouteCache(self.ground_grid_tracker)
 
     @property
     def attack_target(self) -> Point2:
-        if self.enemy_structures:
-            # using a faster cython alternative here from cython extensions library
-            # this is installed for ares users by default
-            # see docs here for all available functions
-            # https://aressc2.github.io/cython-extensions-sc2/
-            return cy_closest_to(self.start_location, self.enemy_structures).position
-        # not seen anything in early game, just head to enemy spawn
-        elif self.time < 240.0:
-            return self.enemy_start_locations[0]
-        # else search the map
-        else:
-            # cycle through expansion locations
-            if self.is_visible(self.current_base_target):
-                self.current_base_target = next(self.expansions_generator)
-
-            return self.current_base_target
+        # closest known enemy structure, else enemy spawn early on, else search
+        # expansions; only recomputed when the enemy structure set changes or the
+        # current search target comes into vision, see `AttackTargetCache`
+        return self.attack_targets.target(self)
 
     async def on_start(self) -> None:
         """
@@ -112,9 +107,10 @@ class MyBot(AresBot):
         """
         await super(MyBot, self).on_start()
 
-        self.current_base_target = self.enemy_start_locations[0]
-        self.expansions_generator = cycle(
-            [pos for pos in self.expansion_locations_list]
+        self.attack_targets.reset(
+            self.start_location,
+            self.enemy_start_locations[0],
+            self.expansion_locations_list,
         )
         self._begin_attack_at_supply = 3.0 if self.race == Race.Terran else 6.0
 
@@ -188,11 +184,24 @@ class MyBot(AresBot):
 
         # get a ground grid to path on, this already contains enemy influence
         grid: np.ndarray = self.mediator.get_ground_grid
+        # note which cells changed since last step, so routes whose cells did not
+        # change are reused instead of re-planned
+        self.ground_grid_tracker.update(grid, self.state.game_loop)
 
         # make a single call to self.attack_target property
         # otherwise it keep calculating for every unit
         target: Point2 = self.attack_target
 
+        # classify every enemy once, nearby groups of neighbouring units overlap
+        enemy_classifier: EnemyClassifier = EnemyClassifier(
+            COMMON_UNIT_IGNORE_TYPES, ALL_STRUCTURES
+        )
+
+        # units with nothing in weapon range share squad maneuvers, see `SquadPlanner`
+        squads: Optional[SquadPlanner] = (
+            SquadPlanner() if self.config.get(SQUAD_MICRO, False) else None
+        )
+
         # use `ares-sc2` combat maneuver system
         # https://aressc2.github.io/ares-sc2/api_reference/behaviors/combat_behaviors.html
         for unit in forces:
@@ -202,20 +211,21 @@ class MyBot(AresBot):
             then all other behaviors will be ignored for this step.
             """
 
+            # we already calculated close enemies, use unit tag to retrieve them
+            # and separate enemy units from enemy structures in the same pass
+            all_close, only_enemy_units = enemy_classifier.split(near_enemy[unit.tag])
+            if (
+                squads is not None
+                and not needs_own_maneuver(unit, self.race, self.BURROW_AT_HEALTH_PERC)
+                and squads.assign(unit, all_close)
+            ):
+                continue
+
             # set up a new CombatManeuver for our unit, we register this a bit later using:
             # self.register_behavior(attacking_maneuver)
             # but we add behaviors first
             attacking_maneuver: CombatManeuver = CombatManeuver()
 
-            # we already calculated close enemies, use unit tag to retrieve them
-            all_close: Units = near_enemy[unit.tag].filter(
-                lambda u: not u.is_memory and u.type_id not in COMMON_UNIT_IGNORE_TYPES
-            )
-            # separate enemy units from enemy structures
-            only_enemy_units: Units = all_close.filter(
-                lambda u: u.type_id not in ALL_STRUCTURES
-            )
-
             if self.race == Race.Zerg:
                 # you can add a CombatManeuver to another CombatManeuver!!!
                 burrow_behavior: CombatManeuver = self.burrow_behavior(unit)
@@ -253,14 +263,31 @@ class MyBot(AresBot):
 
             # no enemy around, path to the attack target
             else:
-                attacking_maneuver.add(
-                    PathUnitToTarget(unit=unit, grid=grid, target=target)
+                # idle units share one flow field towards `target` and keep their
+                # route until the grid changes along it, see `RouteCache`
+                waypoint: Optional[Point2] = self.routes.waypoint(
+                    unit.tag, unit.position, grid, target
                 )
+                if (
+                    waypoint is not None
+                    and unit.distance_to(target) > FLOW_FIELD_ARRIVAL_DISTANCE
+                ):
+                    attacking_maneuver.add(
+                        UseAbility(ability=AbilityId.MOVE_MOVE, unit=unit, target=waypoint)
+                    )
                 attacking_maneuver.add(AMove(unit=unit, target=target))
 
             # DON'T FORGET TO REGISTER OUR COMBAT MANEUVER!!
             self.register_behavior(attacking_maneuver)
 
+        if squads is not None:
+            squads.register(self, grid, target)
+
+    async def on_unit_destroyed(self, unit_tag: int) -> None:
+        await super(MyBot, self).on_unit_destroyed(unit_tag)
+
+        self.routes.release(unit_tag)
+
     def burrow_behavior(self, roach: Unit) -> CombatManeuver:
         """
         Burrow or unburrow roach
@@ -331,11 +358,6 @@ class MyBot(AresBot):
     #
     #     # custom on_building_construction_complete logic here ...
     #
-    # async def on_unit_destroyed(self, unit_tag: int) -> None:
-    #     await super(MyBot, self).on_unit_destroyed(unit_tag)
-    #
-    #     # custom on_unit_destroyed logic here ...
-    #
     # async def on_unit_took_damage(self, unit: Unit, amount_damage_taken: float) -> None:
     #     await super(MyBot, self).on_unit_took_damage(unit, amount_damage_taken)
     #
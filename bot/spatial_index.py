@@ -0,0 +1,114 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from sc2.position import Point2
+from sc2.unit import Unit
+from sc2.units import Units
+
+
+def positions_array(points) -> np.ndarray:
+    """
+    Convert units, a single unit/point or a list of points into an (N, 2) float array.
+
+    Args:
+        points: Units, a Unit, a Point2 or an iterable of Units/Point2
+
+    Returns:
+        np.ndarray of shape (N, 2)
+    """
+    if isinstance(points, (Unit, Point2)):
+        points = [points]
+    coords = [p.position_tuple if isinstance(p, Unit) else (p[0], p[1]) for p in points]
+    if not coords:
+        return np.empty((0, 2), dtype=float)
+    return np.array(coords, dtype=float)
+
+
+class UnitSpatialIndex:
+    """
+    KD-tree over the positions of a group of units.
+
+    Built once per step from a NumPy position array so that "which of these units
+    are within r of each of those points" is answered by one batched query instead
+    of a `Units.filter(lambda e: e.distance_to(x) < r)` scan per caller.
+    """
+
+    def __init__(self, units: Units):
+        self.units = units
+        self._unit_list = list(units)
+        self._bot_object = getattr(units, "_bot_object", None)
+        self.positions = positions_array(self._unit_list)
+        self._tree = cKDTree(self.positions) if self._unit_list else None
+
+    def __len__(self):
+        return len(self._unit_list)
+
+    def _as_units(self, indices) -> Units:
+        return Units([self._unit_list[i] for i in indices], self._bot_object)
+
+    def query_radius(self, points, distance: float) -> list[Units]:
+        """
+        Find the indexed units within `distance` of each of the given points.
+
+        Args:
+            points: Units, list of Point2, or a single Unit/Point2
+            distance: Search radius
+
+        Returns:
+            One Units group per query point, in the same order as `points`
+        """
+        query = positions_array(points)
+        if self._tree is None or len(query) == 0:
+            return [Units([], self._bot_object) for _ in range(len(query))]
+        neighbours = self._tree.query_ball_point(query, distance)
+        return [self._as_units(indices) for indices in neighbours]
+
+    def within(self, point, distance: float) -> Units:
+        """Units within `distance` of a single Unit/Point2."""
+        return self.query_radius(point, distance)[0]
+
+    def any_within(self, points, distance: float) -> np.ndarray:
+        """
+        Boolean mask over `points`, True where at least one indexed unit is within `distance`.
+        """
+        query = positions_array(points)
+        if self._tree is None or len(query) == 0:
+            return np.zeros(len(query), dtype=bool)
+        nearest, _ = self._tree.query(query, k=1, distance_upper_bound=distance)
+        return np.isfinite(nearest)
+
+
+def distance_matrix(sources, targets) -> np.ndarray:
+    """
+    Pairwise distances between two groups of units/points.
+
+    Args:
+        sources: Units, list of Point2, or a single Unit/Point2 (rows)
+        targets: Units, list of Point2, or a single Unit/Point2 (columns)
+
+    Returns:
+        np.ndarray of shape (len(sources), len(targets))
+    """
+    source_positions = positions_array(sources)
+    target_positions = positions_array(targets)
+    deltas = source_positions[:, np.newaxis, :] - target_positions[np.newaxis, :, :]
+    return np.sqrt(np.einsum("ijk,ijk->ij", deltas, deltas))
+
+
+def closest_targets(distances: np.ndarray, max_distance=np.inf) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Closest target per row of a distance matrix.
+
+    Args:
+        distances: (sources x targets) matrix from `distance_matrix`
+        max_distance: Scalar or per-row array; targets further than this do not count as in range
+
+    Returns:
+        Tuple of (closest target index per source, -1 when there are no targets;
+        boolean mask of sources whose closest target is within max_distance)
+    """
+    n_sources, n_targets = distances.shape
+    if n_targets == 0:
+        return np.full(n_sources, -1, dtype=int), np.zeros(n_sources, dtype=bool)
+    closest = np.argmin(distances, axis=1)
+    closest_distance = distances[np.arange(n_sources), closest]
+    return closest, closest_distance < max_distance
@@ -0,0 +1,103 @@
+import numpy as np
+from ares.behaviors.combat import CombatManeuver
+from ares.behaviors.combat.group import AMoveGroup, PathGroupToTarget
+from cython_extensions import cy_in_attack_range, cy_pick_enemy_target
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+from sc2.data import Race
+from sc2.position import Point2
+from sc2.unit import Unit
+from sc2.units import Units
+
+# config.yml key enabling squad micro for the ares bots
+SQUAD_MICRO: str = "SquadMicro"
+# Idle units closer than this (chained) move as one squad
+SQUAD_LINK_DISTANCE: float = 8.0
+# Zerg units at or below this health burrow, so they keep their own maneuver
+BURROW_AT_HEALTH_PERC: float = 0.3
+# Protoss units below this shield are kept safe, so they keep their own maneuver
+LOW_SHIELD_PERC: float = 0.3
+
+
+def needs_own_maneuver(unit: Unit, race: Race, burrow_at_health: float = BURROW_AT_HEALTH_PERC) -> bool:
+    """
+    Whether `unit` must keep a per-unit maneuver even with nothing in range:
+    zerg units that are burrowed or low enough to burrow, and protoss units low
+    on shields. Every other unit may join a squad, see `SquadPlanner`.
+    """
+    if race == Race.Zerg:
+        return unit.is_burrowed or unit.health_percentage <= burrow_at_health
+    return race == Race.Protoss and unit.shield_percentage < LOW_SHIELD_PERC
+
+
+def cluster_units(units: list[Unit], link_distance: float) -> list[list[Unit]]:
+    """Split units into groups whose members are chained together by gaps below `link_distance`."""
+    if len(units) < 2:
+        return [units] if units else []
+    positions = np.array([unit.position_tuple for unit in units])
+    pairs = cKDTree(positions).query_pairs(link_distance, output_type="ndarray")
+    adjacency = coo_matrix(
+        (np.ones(len(pairs), dtype=bool), (pairs[:, 0], pairs[:, 1])),
+        shape=(len(units), len(units)),
+    )
+    _, labels = connected_components(adjacency, directed=False)
+    clusters: dict[int, list[Unit]] = {}
+    for unit, label in zip(units, labels):
+        clusters.setdefault(label, []).append(unit)
+    return list(clusters.values())
+
+
+class SquadPlanner:
+    """
+    Groups army units that do not need a maneuver of their own.
+
+    A unit with nothing to shoot at right now joins a squad: units heading for the
+    same enemy (the one `cy_pick_enemy_target` would pick) share one `AMoveGroup`,
+    and units with no enemy nearby are clustered by position and share one
+    `PathGroupToTarget` towards the attack target. Only units with an enemy in
+    weapon range get the per-unit `CombatManeuver`, so a large army allocates a
+    handful of behaviors per step instead of several per unit.
+    """
+
+    def __init__(self):
+        self.idle: list[Unit] = []
+        self.approaching: dict[int, tuple[Unit, list[Unit]]] = {}
+
+    def assign(self, unit: Unit, all_close: Units) -> bool:
+        """
+        Put `unit` in a squad unless it has an enemy in weapon range.
+
+        Returns:
+            False when the unit needs its own maneuver this step
+        """
+        if not all_close:
+            self.idle.append(unit)
+            return True
+        if cy_in_attack_range(unit, all_close):
+            return False
+        enemy_target: Unit = cy_pick_enemy_target(all_close)
+        self.approaching.setdefault(enemy_target.tag, (enemy_target, []))[1].append(unit)
+        return True
+
+    def register(self, ai, grid: np.ndarray, target: Point2) -> None:
+        """Register one grouped maneuver per squad."""
+        for enemy_target, group in self.approaching.values():
+            ai.register_behavior(
+                AMoveGroup(group=group, group_tags={u.tag for u in group}, target=enemy_target)
+            )
+
+        for group in cluster_units(self.idle, SQUAD_LINK_DISTANCE):
+            group_tags: set[int] = {u.tag for u in group}
+            maneuver: CombatManeuver = CombatManeuver()
+            maneuver.add(
+                PathGroupToTarget(
+                    start=Units(group, ai).center,
+                    group=group,
+                    group_tags=group_tags,
+                    grid=grid,
+                    target=target,
+                )
+            )
+            maneuver.add(AMoveGroup(group=group, group_tags=group_tags, target=target))
+            ai.register_behavior(maneuver)
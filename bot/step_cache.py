@@ -0,0 +1,31 @@
+import functools
+
+
+def step_cached(func):
+    """
+    Cache the result of a HanBot method for the rest of the current step.
+
+    Results are stored in `self.step_cache`, keyed by method name and arguments, and
+    the cache is cleared at the start of every on_step. Stack under `@property` for
+    derived views that take no arguments:
+
+        @property
+        @step_cached
+        def ready_townhalls(self):
+            return self.townhalls.ready
+
+    Only use it for values that do not change within a step; callers must not
+    mutate the returned Units.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *args):
+        key = (name, args)
+        cache = self.step_cache
+        if key in cache:
+            return cache[key]
+        value = cache[key] = func(self, *args)
+        return value
+
+    return wrapper
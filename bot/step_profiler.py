@@ -0,0 +1,151 @@
+import os
+import time
+
+import numpy as np
+
+
+class _Section:
+    """Reusable timing context for one subsystem column."""
+
+    __slots__ = ("_profiler", "_column", "_start", "_children", "last")
+
+    def __init__(self, profiler, column):
+        self._profiler = profiler
+        self._column = column
+        self._start = 0.0
+        self._children = 0.0  # Time spent in sections nested in the current run
+        self.last = 0.0  # Duration of the most recent run including nested sections, in seconds
+
+    def __enter__(self):
+        self._children = 0.0
+        self._profiler._open.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.last = time.perf_counter() - self._start
+        profiler = self._profiler
+        profiler._open.pop()
+        if profiler._open:
+            profiler._open[-1]._children += self.last
+        current = profiler._current
+        if np.isnan(current[self._column]):
+            current[self._column] = 0.0
+        current[self._column] += self.last - self._children
+        return False
+
+
+class StepProfiler:
+    """
+    Records wall time per subsystem per step into a fixed-size ring buffer.
+
+    Each step is one row of float32 milliseconds, one column per subsystem plus a
+    final "step" column with the total. A subsystem that did not run in a step is
+    NaN there, not 0, so it does not drag its percentiles down. A section measured
+    inside another one is only counted in its own column: the enclosing column holds
+    its self time, so the subsystem columns add up to at most the step total.
+    Timing a section costs two perf_counter calls and no allocation, so this is
+    cheap enough to leave on for ladder games.
+
+    Usage:
+        profiler.begin_step(iteration)
+        with profiler.measure("manage_army"):
+            await self.manage_army()
+        profiler.end_step()
+    """
+
+    TOTAL = "step"
+
+    def __init__(self, subsystems, capacity=4096):
+        self.subsystems = list(subsystems) + [self.TOTAL]
+        self.capacity = capacity
+        self.samples = np.zeros((capacity, len(self.subsystems)), dtype=np.float32)
+        self.iterations = np.full(capacity, -1, dtype=np.int32)
+        self._sections = {
+            name: _Section(self, column) for column, name in enumerate(self.subsystems)
+        }
+        self._current = np.full(len(self.subsystems), np.nan, dtype=np.float64)
+        self._open = []  # Sections currently being measured, innermost last
+        self._row = 0
+        self._count = 0
+        self._iteration = -1
+        self._step_start = 0.0
+
+    def begin_step(self, iteration):
+        """Start timing a new step."""
+        self._current[:] = np.nan
+        self._open.clear()
+        self._iteration = iteration
+        self._step_start = time.perf_counter()
+
+    def measure(self, name):
+        """Context manager adding the wall time of the block to subsystem `name` for this step."""
+        return self._sections[name]
+
+    def elapsed(self):
+        """Seconds elapsed since `begin_step`."""
+        return time.perf_counter() - self._step_start
+
+    def end_step(self):
+        """Close the current step and write its row into the ring buffer."""
+        self._current[-1] = self.elapsed()
+        self.samples[self._row] = self._current * 1000.0
+        self.iterations[self._row] = self._iteration
+        self._row = (self._row + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def last_step_ms(self):
+        """Total time in milliseconds of the most recently closed step."""
+        if not self._count:
+            return 0.0
+        return float(self.samples[self._row - 1, -1])
+
+    def _ordered(self):
+        """Buffered rows in chronological order."""
+        if self._count < self.capacity:
+            return self.samples[: self._count], self.iterations[: self._count]
+        order = np.roll(np.arange(self.capacity), -self._row)
+        return self.samples[order], self.iterations[order]
+
+    def stats(self):
+        """
+        Latency summary per subsystem over the buffered steps it ran in.
+
+        Returns:
+            dict of subsystem name -> {"runs": steps, "p50": ms, "p95": ms, "max": ms},
+            subsystems that never ran are left out
+        """
+        samples, _ = self._ordered()
+        stats = {}
+        for i, name in enumerate(self.subsystems):
+            ran = samples[:, i][~np.isnan(samples[:, i])]
+            if not len(ran):
+                continue
+            p50, p95 = np.percentile(ran, [50, 95])
+            stats[name] = {"runs": len(ran), "p50": float(p50), "p95": float(p95), "max": float(ran.max())}
+        return stats
+
+    def summary(self):
+        """One line per subsystem, suitable for printing."""
+        return "\n".join(
+            f"{name:<32} runs {s['runs']:6d}  p50 {s['p50']:7.2f}ms  p95 {s['p95']:7.2f}ms  max {s['max']:7.2f}ms"
+            for name, s in self.stats().items()
+        )
+
+    def dump(self, path):
+        """
+        Write the buffered steps to a compressed .npz file.
+
+        The file holds `samples` (steps x subsystems, ms, NaN where a subsystem did not
+        run), `iterations` and `subsystems`.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        samples, iterations = self._ordered()
+        np.savez_compressed(
+            path,
+            samples=samples,
+            iterations=iterations,
+            subsystems=np.array(self.subsystems),
+        )
@@ -0,0 +1,337 @@
+"""
+Record the observations a bot receives during a real game and replay them offline.
+
+A recording is a sequence of length-prefixed records (1 byte kind, 4 byte payload
+length, payload): one header, the game data and game info responses, then one
+observation per step, preceded by the pathing grid whenever it changed. Replaying
+feeds the same observations through the same calls `sc2.main._play_game_ai` makes,
+against a `StubClient` that answers every request locally, so step cost can be
+measured without StarCraft II.
+"""
+import gc
+import json
+import math
+import struct
+import time
+import tracemalloc
+
+import numpy as np
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2.client import Client
+from sc2.data import Result, Status
+from sc2.game_data import GameData
+from sc2.game_info import GameInfo
+from sc2.game_state import GameState
+
+RECORD_HEADER = struct.Struct("<BI")  # kind, payload length
+
+HEADER = 0  # JSON: player_id, base_build, game_step
+GAME_DATA = 1  # sc_pb.ResponseData
+GAME_INFO = 2  # sc_pb.ResponseGameInfo
+PATHING_GRID = 3  # Raw pathing grid bits, only written when they changed
+OBSERVATION = 4  # sc_pb.ResponseObservation
+
+# Every field python-sc2 requests in Client.get_game_data
+GAME_DATA_REQUEST = sc_pb.RequestData(
+    ability_id=True, unit_type_id=True, upgrade_id=True, buff_id=True, effect_id=True
+)
+
+
+def write_record(file, kind, payload):
+    file.write(RECORD_HEADER.pack(kind, len(payload)))
+    file.write(payload)
+
+
+def read_records(path):
+    """Yield (kind, payload) for every record in a recording."""
+    with open(path, "rb") as file:
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            kind, length = RECORD_HEADER.unpack(header)
+            yield kind, file.read(length)
+
+
+class StepRecorder:
+    """
+    Writes everything a bot needs to replay its game into a recording file.
+
+    Attach it to a bot before the game starts; it wraps the bot's `on_start`,
+    `_prepare_step` and `on_end` on the instance, so no bot code changes:
+
+        bot = HanBot()
+        StepRecorder("data/han_game.sc2steps").attach(bot)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._pending_steps = []  # Steps prepared before on_start, when the file is not open yet
+        self._pathing_grid = None
+
+    def attach(self, bot):
+        on_start = bot.on_start
+        prepare_step = bot._prepare_step
+        on_end = bot.on_end
+
+        async def recording_on_start():
+            await self._start(bot)
+            await on_start()
+
+        def recording_prepare_step(state, proto_game_info):
+            prepare_step(state, proto_game_info)
+            self._step(state, proto_game_info)
+
+        async def recording_on_end(game_result):
+            try:
+                await on_end(game_result)
+            finally:
+                self.close()
+
+        bot.on_start = recording_on_start
+        bot._prepare_step = recording_prepare_step
+        bot.on_end = recording_on_end
+        return bot
+
+    async def _start(self, bot):
+        # GameData does not keep its proto, so ask for it once more
+        response = await bot.client._execute(data=GAME_DATA_REQUEST)
+        header = {
+            "player_id": bot.player_id,
+            "base_build": bot.base_build,
+            "game_step": bot.client.game_step,
+        }
+        self._file = open(self.path, "wb")
+        write_record(self._file, HEADER, json.dumps(header).encode())
+        write_record(self._file, GAME_DATA, response.data.SerializeToString())
+        write_record(self._file, GAME_INFO, bot.game_info._proto.SerializeToString())
+        for state, pathing_grid in self._pending_steps:
+            self._write_step(state, pathing_grid)
+        self._pending_steps = []
+
+    def _step(self, state, proto_game_info):
+        pathing_grid = proto_game_info.game_info.start_raw.pathing_grid.data
+        if self._file is None:
+            self._pending_steps.append((state, pathing_grid))
+        else:
+            self._write_step(state, pathing_grid)
+
+    def _write_step(self, state, pathing_grid):
+        if pathing_grid != self._pathing_grid:
+            self._pathing_grid = pathing_grid
+            write_record(self._file, PATHING_GRID, pathing_grid)
+        write_record(self._file, OBSERVATION, state.response_observation.SerializeToString())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class StubClient(Client):
+    """
+    Client that answers every request locally instead of talking to StarCraft II.
+
+    Actions are accepted and counted. Queries get plausible answers: pathing
+    distances are straight-line distances, every building placement is valid and
+    no abilities are available. Game data and game info come from the recording.
+    """
+
+    def __init__(self, game_data, game_info, base_build, game_step):
+        # The websocket is never used, every request goes through _execute below
+        super().__init__(ws=object())
+        self._status = Status.in_game
+        self.game_step = game_step
+        self.game_data_response = sc_pb.Response(data=game_data)
+        self.game_info_response = sc_pb.Response(game_info=game_info)
+        self.base_build = base_build
+        self.observation_response = sc_pb.Response()
+        self.unit_positions = {}
+        self.request_counts = {}
+        self.action_count = 0
+
+    def set_observation(self, observation):
+        self.observation_response = sc_pb.Response(observation=observation)
+        self.unit_positions = {
+            unit.tag: (unit.pos.x, unit.pos.y) for unit in observation.observation.raw_data.units
+        }
+
+    def set_pathing_grid(self, pathing_grid):
+        self.game_info_response.game_info.start_raw.pathing_grid.data = pathing_grid
+
+    def _pathing_distance(self, request):
+        if request.HasField("unit_tag"):
+            start = self.unit_positions.get(request.unit_tag)
+            if start is None:
+                return 0.0
+        else:
+            start = (request.start_pos.x, request.start_pos.y)
+        return math.hypot(request.end_pos.x - start[0], request.end_pos.y - start[1])
+
+    def _query(self, request):
+        response = sc_pb.Response()
+        for pathing in request.pathing:
+            response.query.pathing.add(distance=self._pathing_distance(pathing))
+        for _ in request.placements:
+            response.query.placements.add(result=1)  # ActionResult.Success
+        for abilities in request.abilities:
+            response.query.abilities.add(unit_tag=abilities.unit_tag)
+        return response
+
+    async def _execute(self, **kwargs):
+        assert len(kwargs) == 1, "Only one request allowed by the API"
+        kind, request = next(iter(kwargs.items()))
+        self.request_counts[kind] = self.request_counts.get(kind, 0) + 1
+        if kind == "action":
+            self.action_count += len(request.actions)
+            response = sc_pb.Response()
+            response.action.result.extend([1] * len(request.actions))
+            return response
+        if kind == "query":
+            return self._query(request)
+        if kind == "observation":
+            return self.observation_response
+        if kind == "game_info":
+            return self.game_info_response
+        if kind == "data":
+            return self.game_data_response
+        if kind == "ping":
+            response = sc_pb.Response()
+            response.ping.base_build = self.base_build
+            return response
+        return sc_pb.Response()
+
+
+def _gc_collections():
+    return sum(generation["collections"] for generation in gc.get_stats())
+
+
+def open_recording(path):
+    """
+    Read the start of a recording.
+
+    Returns:
+        Tuple of (header dict, StubClient serving the recorded game data and game
+        info, iterator of the recorded ResponseObservations). Iterating also keeps
+        the client's pathing grid and observation in sync with the current step.
+    """
+    records = read_records(path)
+    kind, payload = next(records)
+    assert kind == HEADER, "Recording does not start with a header"
+    header = json.loads(payload)
+    game_data = sc_pb.ResponseData()
+    game_info = sc_pb.ResponseGameInfo()
+    for expected, message in ((GAME_DATA, game_data), (GAME_INFO, game_info)):
+        kind, payload = next(records)
+        assert kind == expected, f"Expected record kind {expected}, got {kind}"
+        message.ParseFromString(payload)
+    client = StubClient(game_data, game_info, header["base_build"], header["game_step"])
+
+    def observations():
+        for kind, payload in records:
+            if kind == PATHING_GRID:
+                client.set_pathing_grid(payload)
+            elif kind == OBSERVATION:
+                observation = sc_pb.ResponseObservation()
+                observation.ParseFromString(payload)
+                client.set_observation(observation)
+                yield observation
+
+    return header, client, observations()
+
+
+async def start_bot(bot, header, client, observation):
+    """Run a fresh bot through game start on `observation`, like `_play_game_ai`'s first step."""
+    bot._initialize_variables()
+    bot._prepare_start(
+        client,
+        header["player_id"],
+        GameInfo(client.game_info_response.game_info),
+        GameData(client.game_data_response.data),
+        realtime=False,
+        base_build=header["base_build"],
+    )
+    bot._prepare_step(GameState(observation), client.game_info_response)
+    await bot.on_before_start()
+    bot._prepare_first_step()
+    await bot.on_start()
+
+
+def _iteration_observations(start_observation, steps):
+    """
+    The observation of each iteration, iteration 0 running on the start observation.
+
+    `_play_game_ai` requests an observation again before iteration 0 without stepping
+    the game, so a live recording holds the start game loop twice; the repeat is
+    skipped, iterations then line up with the live ones.
+    """
+    yield start_observation
+    start_loop = start_observation.observation.game_loop
+    for observation in steps:
+        if observation.observation.game_loop == start_loop:
+            continue
+        yield observation
+
+
+async def replay(bot, path, trace_allocations=True, max_steps=None, end_game=False):
+    """
+    Replay a recording into a fresh bot the way `sc2.main._play_game_ai` drives a real game.
+
+    Args:
+        bot: New, unstarted bot instance (HanBot, QinBot, MyBot, ...)
+        path: Recording written by StepRecorder
+        trace_allocations: Record per-step allocation stats with tracemalloc (slows steps down)
+        max_steps: Stop after this many steps
+        end_game: Call the bot's `on_end` after the last step; off by default, bots
+            write files there (HanBot's step profile, ares match history)
+
+    Returns:
+        dict of per-iteration np.ndarrays: iteration, game_loop, step_ms, actions,
+        gc_collections and, when tracing, alloc_peak_kb and alloc_net_kb; plus
+        "requests", the number of requests of each kind the bot made
+    """
+    header, client, steps = open_recording(path)
+    start_observation = next(steps)
+    await start_bot(bot, header, client, start_observation)
+
+    columns = {name: [] for name in ("iteration", "game_loop", "step_ms", "actions", "gc_collections")}
+    if trace_allocations:
+        columns.update(alloc_peak_kb=[], alloc_net_kb=[])
+        tracemalloc.start()
+    try:
+        for iteration, observation in enumerate(_iteration_observations(start_observation, steps)):
+            if max_steps is not None and iteration >= max_steps:
+                break
+            state = GameState(observation)
+            bot._prepare_step(state, client.game_info_response)
+
+            actions_before = client.action_count
+            collections_before = _gc_collections()
+            if trace_allocations:
+                tracemalloc.reset_peak()
+                memory_before, _ = tracemalloc.get_traced_memory()
+            start = time.perf_counter()
+            await bot.issue_events()
+            await bot.on_step(iteration)
+            await bot._after_step()
+            step_time = time.perf_counter() - start
+
+            columns["iteration"].append(iteration)
+            columns["game_loop"].append(state.game_loop)
+            columns["step_ms"].append(step_time * 1000.0)
+            columns["actions"].append(client.action_count - actions_before)
+            columns["gc_collections"].append(_gc_collections() - collections_before)
+            if trace_allocations:
+                memory_after, peak = tracemalloc.get_traced_memory()
+                columns["alloc_peak_kb"].append((peak - memory_before) / 1024.0)
+                columns["alloc_net_kb"].append((memory_after - memory_before) / 1024.0)
+    finally:
+        if trace_allocations:
+            tracemalloc.stop()
+    if end_game:
+        await bot.on_end(Result.Tie)
+
+    results = {name: np.array(values) for name, values in columns.items()}
+    results["requests"] = dict(client.request_counts)
+    return results
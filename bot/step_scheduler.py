@@ -0,0 +1,65 @@
+class StepScheduler:
+    """
+    Frame-budget scheduler for HanBot managers.
+
+    Managers are either critical (always run) or deferrable. A deferrable manager is
+    pushed to a later frame when the previous frame ran over budget, or when running
+    it now (using its recent cost as the estimate) would take the current frame over
+    budget. A manager is never deferred more than `max_deferred_steps` frames in a row,
+    so scouting, addons and upgrades still happen during long fights, just less often.
+    """
+
+    def __init__(self, deferrable, budget=0.040, max_deferred_steps=16, smoothing=0.2):
+        """
+        Args:
+            deferrable: Names of managers that may be pushed to a later frame
+            budget: Target wall time per frame in seconds
+            max_deferred_steps: Consecutive frames a manager may be skipped before it is forced to run
+            smoothing: Weight of the newest sample in the per-manager cost estimate
+        """
+        self.deferrable = set(deferrable)
+        self.budget = budget
+        self.max_deferred_steps = max_deferred_steps
+        self.smoothing = smoothing
+        self.expected_cost = {name: 0.0 for name in self.deferrable}
+        self.deferred_steps = {name: 0 for name in self.deferrable}
+        self.deferred_this_step = []
+        self._previous_step_over_budget = False
+
+    def begin_step(self, previous_step_time):
+        """
+        Start a new frame.
+
+        Args:
+            previous_step_time: Wall time of the previous frame in seconds
+        """
+        self._previous_step_over_budget = previous_step_time > self.budget
+        self.deferred_this_step = []
+
+    def should_run(self, name, elapsed):
+        """
+        Whether manager `name` runs this frame.
+
+        Args:
+            name: Manager name
+            elapsed: Wall time already spent in this frame in seconds
+
+        Returns:
+            bool
+        """
+        if name not in self.deferrable:
+            return True
+        if self.deferred_steps[name] < self.max_deferred_steps and (
+            self._previous_step_over_budget
+            or elapsed + self.expected_cost[name] > self.budget
+        ):
+            self.deferred_steps[name] += 1
+            self.deferred_this_step.append(name)
+            return False
+        self.deferred_steps[name] = 0
+        return True
+
+    def record(self, name, duration):
+        """Update the cost estimate of a deferrable manager after it ran."""
+        if name in self.expected_cost:
+            self.expected_cost[name] += self.smoothing * (duration - self.expected_cost[name])
@@ -0,0 +1,52 @@
+import math
+
+import numpy as np
+
+from bot.spatial_index import distance_matrix
+
+
+def assign_supports(supports, anchors, previous=None):
+    """
+    Spread support units (medivacs, ravens) over the anchor units they should follow.
+
+    Each anchor takes at most ceil(supports / anchors) supports. A support keeps its
+    previous anchor while that anchor is still an anchor and has room, so supports do
+    not bounce between targets every step. The others are handed, in tag order, to the
+    nearest anchor that still has room. The result only depends on unit positions and
+    tags, so the same situation always produces the same assignment.
+
+    Args:
+        supports: Units to assign
+        anchors: Units to follow
+        previous: dict of support tag -> anchor tag from the previous step
+
+    Returns:
+        dict of support tag -> anchor Unit
+    """
+    if not supports or not anchors:
+        return {}
+    previous = previous or {}
+    anchor_list = sorted(anchors, key=lambda unit: unit.tag)
+    anchor_index = {unit.tag: i for i, unit in enumerate(anchor_list)}
+    capacity = math.ceil(len(supports) / len(anchor_list))
+    load = np.zeros(len(anchor_list), dtype=int)
+    assignments = {}
+
+    unassigned = []
+    for support in sorted(supports, key=lambda unit: unit.tag):
+        i = anchor_index.get(previous.get(support.tag))
+        if i is not None and load[i] < capacity:
+            assignments[support.tag] = anchor_list[i]
+            load[i] += 1
+        else:
+            unassigned.append(support)
+
+    if unassigned:
+        distances = distance_matrix(unassigned, anchor_list)
+        for support, row in zip(unassigned, distances):
+            for i in np.argsort(row, kind="stable"):
+                if load[i] < capacity:
+                    assignments[support.tag] = anchor_list[i]
+                    load[i] += 1
+                    break
+    return assignments
@@ -0,0 +1,119 @@
+import numpy as np
+from sc2.ids.unit_typeid import UnitTypeId
+
+# Used for unit types that are neither in the game data nor in the fallback table
+DEFAULT_UNIT_COST = (100, 25)
+
+# Comprehensive dictionary of unit costs (mineral, gas)
+FALLBACK_UNIT_COSTS = {
+    # Terran
+    UnitTypeId.SCV: (50, 0),
+    UnitTypeId.MARINE: (50, 0),
+    UnitTypeId.MARAUDER: (100, 25),
+    UnitTypeId.REAPER: (50, 50),
+    UnitTypeId.GHOST: (150, 125),
+    UnitTypeId.HELLION: (100, 0),
+    UnitTypeId.HELLIONTANK: (100, 0),
+    UnitTypeId.SIEGETANK: (150, 125),
+    UnitTypeId.SIEGETANKSIEGED: (150, 125),
+    UnitTypeId.CYCLONE: (150, 100),
+    UnitTypeId.WIDOWMINE: (75, 25),
+    UnitTypeId.WIDOWMINEBURROWED: (75, 25),
+    UnitTypeId.THOR: (300, 200),
+    UnitTypeId.THORAP: (300, 200),
+    UnitTypeId.VIKINGFIGHTER: (150, 75),
+    UnitTypeId.VIKINGASSAULT: (150, 75),
+    UnitTypeId.MEDIVAC: (100, 100),
+    UnitTypeId.LIBERATOR: (150, 150),
+    UnitTypeId.LIBERATORAG: (150, 150),
+    UnitTypeId.RAVEN: (100, 200),
+    UnitTypeId.BANSHEE: (150, 100),
+    UnitTypeId.BATTLECRUISER: (400, 300),
+    
+    # Protoss
+    UnitTypeId.PROBE: (50, 0),
+    UnitTypeId.ZEALOT: (100, 0),
+    UnitTypeId.STALKER: (125, 50),
+    UnitTypeId.SENTRY: (50, 100),
+    UnitTypeId.ADEPT: (100, 25),
+    UnitTypeId.HIGHTEMPLAR: (50, 150),
+    UnitTypeId.DARKTEMPLAR: (125, 125),
+    UnitTypeId.IMMORTAL: (275, 100),
+    UnitTypeId.COLOSSUS: (300, 200),
+    UnitTypeId.DISRUPTOR: (150, 150),
+    UnitTypeId.ARCHON: (100, 300),  # Approximation (2 HTs)
+    UnitTypeId.OBSERVER: (25, 75),
+    UnitTypeId.WARPPRISM: (200, 0),
+    UnitTypeId.PHOENIX: (150, 100),
+    UnitTypeId.VOIDRAY: (250, 150),
+    UnitTypeId.ORACLE: (150, 150),
+    UnitTypeId.CARRIER: (350, 250),
+    UnitTypeId.TEMPEST: (250, 175),
+    UnitTypeId.MOTHERSHIP: (400, 400),
+    
+    # Zerg
+    UnitTypeId.DRONE: (50, 0),
+    UnitTypeId.ZERGLING: (25, 0),
+    UnitTypeId.BANELING: (25, 25),  # Plus zergling cost
+    UnitTypeId.ROACH: (75, 25),
+    UnitTypeId.RAVAGER: (75, 75),  # Plus roach cost
+    UnitTypeId.HYDRALISK: (100, 50),
+    UnitTypeId.LURKER: (50, 100),  # Plus hydra cost
+    UnitTypeId.INFESTOR: (100, 150),
+    UnitTypeId.SWARMHOSTMP: (100, 75),
+    UnitTypeId.ULTRALISK: (300, 200),
+    UnitTypeId.OVERLORD: (100, 0),
+    UnitTypeId.OVERSEER: (50, 50),  # Plus overlord cost
+    UnitTypeId.MUTALISK: (100, 100),
+    UnitTypeId.CORRUPTOR: (150, 100),
+    UnitTypeId.BROODLORD: (150, 150),  # Plus corruptor cost
+    UnitTypeId.VIPER: (100, 200),
+}
+
+
+def build_cost_table(game_data):
+    """
+    Build a (mineral, gas) cost table indexed by UnitTypeId value.
+
+    Costs from the game data take precedence; the fallback table fills in unit types
+    the game data does not know about, and everything else gets DEFAULT_UNIT_COST.
+
+    Args:
+        game_data: GameData of the running game, or None to use only the fallback table
+
+    Returns:
+        np.ndarray of shape (max type id + 1, 2)
+    """
+    game_units = game_data.units if game_data is not None else {}
+    size = max([type_id.value for type_id in UnitTypeId] + list(game_units)) + 1
+    table = np.tile(np.array(DEFAULT_UNIT_COST, dtype=np.int32), (size, 1))
+    for type_id, cost in FALLBACK_UNIT_COSTS.items():
+        table[type_id.value] = cost
+    for type_value, unit_data in game_units.items():
+        cost = unit_data.cost
+        table[type_value] = (cost.minerals, cost.vespene)
+    return table
+
+
+def type_id_array(units):
+    """UnitTypeId values of a group of units as an int array."""
+    return np.fromiter((unit.type_id.value for unit in units), dtype=np.int64, count=len(units))
+
+
+def army_value(cost_table, units):
+    """
+    Total minerals + gas of a group of units in one vectorized lookup.
+
+    Args:
+        cost_table: Table from `build_cost_table`
+        units: Units (or any sized iterable of Unit)
+
+    Returns:
+        int
+    """
+    if not len(units):
+        return 0
+    type_ids = type_id_array(units)
+    known = type_ids < len(cost_table)
+    value = int(cost_table[type_ids[known]].sum())
+    return value + int((~known).sum()) * sum(DEFAULT_UNIT_COST)
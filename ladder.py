@@ -6,12 +6,25 @@
 import argparse
 import asyncio
 import logging
+import time
+from array import array
+from typing import Optional
 
 import aiohttp
+import numpy as np
 import sc2
 from sc2.client import Client
 from sc2.protocol import ConnectionAlreadyClosed
 
+from bot.protocol_trace import ProtocolTrace, TracingClient
+
+# The game's responses are already compact protobuf, per-message compression only
+# costs CPU on both ends
+WS_COMPRESS: int = 0
+# Game info and observations on large maps exceed aiohttp's 4 MiB default
+WS_MAX_MESSAGE_SIZE: int = 128 * 1024 * 1024
+WS_TIMEOUT: float = 120
+
 
 def run_ladder_game(bot):
     # Load command line arguments
@@ -28,6 +41,12 @@ def run_ladder_game(bot):
     )
     parser.add_argument("--OpponentId", type=str, nargs="?", help="Opponent ID")
     parser.add_argument("--RealTime", action="store_true", help="real time flag")
+    parser.add_argument(
+        "--Heartbeat", type=float, nargs="?", help="Websocket heartbeat in seconds"
+    )
+    parser.add_argument(
+        "--ProtocolTrace", type=str, nargs="?", help="Write a protocol trace here"
+    )
     args, unknown = parser.parse_known_args()
 
     if args.LadderServer is None:
@@ -56,15 +75,139 @@ def run_ladder_game(bot):
         players=[bot],
         realtime=args.RealTime,
         portconfig=portconfig,
+        heartbeat=args.Heartbeat,
+        trace_path=args.ProtocolTrace,
     )
 
     # Run it
-    result = asyncio.get_event_loop().run_until_complete(g)
+    result = asyncio.run(g)
     return result, args.OpponentId
 
 
+class TimedWebSocket:
+    """
+    Websocket stand-in for `sc2.client.Client` that times every request.
+
+    The client sends one request and waits for its response before sending the
+    next, so the time from `send_bytes` to the following `receive_bytes` is that
+    request's round trip. Everything else passes through to the websocket.
+    """
+
+    def __init__(self, ws: aiohttp.ClientWebSocketResponse):
+        self._ws = ws
+        self._sent_at: Optional[float] = None
+        self.round_trips: array = array("d")
+
+    async def send_bytes(self, data: bytes, *args, **kwargs) -> None:
+        self._sent_at = time.perf_counter()
+        await self._ws.send_bytes(data, *args, **kwargs)
+
+    async def receive_bytes(self, *args, **kwargs) -> bytes:
+        data = await self._ws.receive_bytes(*args, **kwargs)
+        if self._sent_at is not None:
+            self.round_trips.append(time.perf_counter() - self._sent_at)
+            self._sent_at = None
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+
+class LadderConnection:
+    """
+    The websocket to the game for one ladder match, with its own session and connector.
+
+        async with LadderConnection(host, port) as connection:
+            await sc2.main._play_game(bot, connection.client, ...)
+
+    The websocket, session and connector are closed on leaving the block however it
+    is left, including when connecting fails. `summary` reports the connect latency
+    and the round-trip times of the requests made so far. With `trace_path` set,
+    every request is also written to a protocol trace, see `bot.protocol_trace`.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        heartbeat: Optional[float] = None,
+        max_msg_size: int = WS_MAX_MESSAGE_SIZE,
+        trace_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            host: Game host
+            port: Game port
+            heartbeat: Seconds between websocket pings, None to not send any
+            max_msg_size: Largest websocket message accepted, in bytes
+            trace_path: Protocol trace file, None to not trace
+        """
+        self.url = f"ws://{host}:{port}/sc2api"
+        self.heartbeat = heartbeat
+        self.max_msg_size = max_msg_size
+        self.trace_path = trace_path
+        self.trace: Optional[ProtocolTrace] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.ws: Optional[TimedWebSocket] = None
+        self.client: Optional[Client] = None
+        self.connect_latency: Optional[float] = None
+
+    async def __aenter__(self) -> "LadderConnection":
+        # a single connection to a single host, keep the connector to that
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=1))
+        try:
+            start = time.perf_counter()
+            ws = await self.session.ws_connect(
+                self.url,
+                timeout=WS_TIMEOUT,
+                compress=WS_COMPRESS,
+                max_msg_size=self.max_msg_size,
+                heartbeat=self.heartbeat,
+            )
+            self.connect_latency = time.perf_counter() - start
+        except BaseException:
+            await self.close()
+            raise
+        self.ws = TimedWebSocket(ws)
+        if self.trace_path is None:
+            self.client = Client(self.ws)
+        else:
+            self.trace = ProtocolTrace(self.trace_path)
+            self.client = TracingClient(self.ws, trace=self.trace)
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the websocket and the session, which owns the connector."""
+        try:
+            if self.ws is not None and not self.ws.closed:
+                await self.ws.close()
+        finally:
+            if self.session is not None and not self.session.closed:
+                await self.session.close()
+            if self.trace is not None:
+                self.trace.close()
+
+    def summary(self) -> str:
+        if self.connect_latency is None:
+            return f"{self.url}: not connected"
+        text = f"{self.url}: connected in {self.connect_latency * 1000:.1f} ms"
+        if self.ws is not None and self.ws.round_trips:
+            round_trips = np.frombuffer(self.ws.round_trips, dtype=np.float64) * 1000
+            p50, p95 = np.percentile(round_trips, [50, 95])
+            text += (
+                f", {len(round_trips)} requests, round trip"
+                f" mean {round_trips.mean():.2f} p50 {p50:.2f} p95 {p95:.2f}"
+                f" max {round_trips.max():.2f} ms"
+            )
+        return text
+
+
 # Modified version of sc2.main._join_game to allow custom host and port,
-# and to not spawn an additional sc2process (thanks to alkurbatov for fix)
+# and to not spawn an additional sc2process (thanks to alkurbatov for fix).
+# The connection is managed by `LadderConnection`.
 async def join_ladder_game(
     host,
     port,
@@ -74,21 +217,27 @@ async def join_ladder_game(
     save_replay_as=None,
     step_time_limit=None,
     game_time_limit=None,
+    heartbeat=None,
+    trace_path=None,
 ):
-    ws_url = f"ws://{host}:{port}/sc2api"
-    ws_connection = await aiohttp.ClientSession().ws_connect(ws_url, timeout=120)
-
-    client = Client(ws_connection)
-    try:
-        result = await sc2.main._play_game(
-            players[0], client, realtime, portconfig, step_time_limit, game_time_limit
-        )
-        if save_replay_as is not None:
-            await client.save_replay(save_replay_as)
-    except ConnectionAlreadyClosed:
-        logging.error(f"Connection was closed before the game ended")
-        return None
-    finally:
-        await ws_connection.close()
+    async with LadderConnection(
+        host, port, heartbeat=heartbeat, trace_path=trace_path
+    ) as connection:
+        try:
+            result = await sc2.main._play_game(
+                players[0],
+                connection.client,
+                realtime,
+                portconfig,
+                step_time_limit,
+                game_time_limit,
+            )
+            if save_replay_as is not None:
+                await connection.client.save_replay(save_replay_as)
+        except ConnectionAlreadyClosed:
+            logging.error(f"Connection was closed before the game ended")
+            return None
+        finally:
+            logging.info(connection.summary())
 
     return result
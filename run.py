@@ -2,7 +2,7 @@ import random
 import sys
 from os import path
 from pathlib import Path
-from typing import List
+from typing import Optional
 
 from sc2 import maps
 from sc2.data import AIBuild, Difficulty, Race
@@ -18,14 +18,15 @@ import yaml
 from bot.qin import QinBot
 from bot.han import HanBot
 from bot.random import MyBot
+from bot.map_index import MapIndex
+from bot.protocol_trace import traced_clients
+from bot.step_replay import StepRecorder
 from ladder import run_ladder_game
 
-# change if non default setup / linux
-# if having issues with this, modify `map_list` below manually
-#MAPS_PATH: str = "C:\\Program Files (x86)\\StarCraft II\\Maps"
-MAPS_PATH: str = "/Applications/StarCraft II/Maps"
+# Maps are found in python-sc2's maps directory of the local install, set the
+# SC2_MAPS_PATH environment variable to use another one, see `bot.map_index`
 CONFIG_FILE: str = "config.yml"
-MAP_FILE_EXT: str = "SC2Map"
+MAP_POOL: str = "MapPool"
 MY_BOT_NAME: str = "MyBotName"
 MY_BOT_RACE: str = "MyBotRace"
 
@@ -33,6 +34,7 @@ MY_BOT_RACE: str = "MyBotRace"
 def main():
     bot_name: str = "QinBot"
     race: Race = Race.Random
+    map_weights: dict[str, float] = {}
 
     __user_config_location__: str = path.abspath(".")
     user_config_path: str = path.join(__user_config_location__, CONFIG_FILE)
@@ -44,6 +46,7 @@ def main():
                 bot_name = config[MY_BOT_NAME]
             if MY_BOT_RACE in config:
                 race = Race[config[MY_BOT_RACE].title()]
+            map_weights = config.get(MAP_POOL) or {}
 
     bot1 = Bot(race, QinBot(), bot_name)
 
@@ -54,35 +57,37 @@ def main():
         print(result, " against opponent ", opponentid)
     else:
         # Local game
-#        map_list: List[str] = [
-#            p.name.replace(f".{MAP_FILE_EXT}", "")
-#            for p in Path(MAPS_PATH).glob(f"*.{MAP_FILE_EXT}")
-#            if p.is_file()
-#        ]
-        # List some maps that could crash the code. Used to fix issues.
-        map_list: List[str] = [
-            p.name.replace(f".{MAP_FILE_EXT}", "")
-            for p in Path(MAPS_PATH).glob(f"*.{MAP_FILE_EXT}")
-            if p.is_file()
-        #    "BlackpinkLE",
-        #    "BattleontheBoardwalkLE",
-        #    "EphemeronAIE",
-        #    "AscensiontoAiurLE",
-        ]
+        # the index is only rebuilt when the maps directory changed
+        map_index: MapIndex = MapIndex()
+        picked: list[str] = map_index.pick(random.Random(), map_weights)
+        if not picked:
+            searched = map_index.directory or "python-sc2's maps directory (no StarCraft II install found)"
+            sys.exit(f"No maps to play from {searched}, set SC2_MAPS_PATH or check MapPool in {CONFIG_FILE}")
+        map_name: str = picked[0]
 
         random_race = random.choice([Race.Zerg, Race.Terran, Race.Protoss])
-        print("Starting local game...")
-        run_game(
-            maps.get(random.choice(map_list)),
-            [
-#                bot1,
-                Bot(Race.Terran, HanBot(), 'HanBot'),
-                Bot(Race.Terran, MyBot(), 'RandomBot'),
-#                Computer(Race.Protoss, Difficulty.CheatInsane, ai_build=AIBuild.Macro),
-#                Computer(Race.Protoss, Difficulty.Easy, ai_build=AIBuild.Macro),
-            ],
-            realtime=False,
+        players = [
+#            bot1,
+            Bot(Race.Terran, HanBot(), 'HanBot'),
+            Bot(Race.Terran, MyBot(), 'RandomBot'),
+#            Computer(Race.Protoss, Difficulty.CheatInsane, ai_build=AIBuild.Macro),
+#            Computer(Race.Protoss, Difficulty.Easy, ai_build=AIBuild.Macro),
+        ]
+        if "--record" in sys.argv:
+            # Record the first player's observations for scripts/replay_benchmark.py,
+            # whichever bot it is
+            StepRecorder(sys.argv[sys.argv.index("--record") + 1]).attach(players[0].ai)
+        # Write a protocol trace per bot for scripts/protocol_report.py
+        trace_path: Optional[str] = (
+            sys.argv[sys.argv.index("--trace") + 1] if "--trace" in sys.argv else None
         )
+        print("Starting local game...")
+        with traced_clients(trace_path):
+            run_game(
+                maps.Map(Path(map_index.maps[map_name]["path"])),
+                players,
+                realtime=False,
+            )
 
 
 # Start game
@@ -0,0 +1,283 @@
+"""
+Plays many local games in parallel to evaluate a change.
+
+The matchups are every map x opponent x opponent race from the `BatchGames`
+section of config.yml, maps coming from `--maps`, the config or else the map index
+(`bot.map_index`); with `--games N`, N games on those maps drawn from the weighted
+`MapPool` instead. Games run
+across a process pool, one game and so one StarCraft II instance (two for
+bot-vs-bot) per worker at a time, each in a fresh process. Every result is
+appended to OUT/results.jsonl as soon as its game ends, with the per-game
+step-time stats of our bot, and replays go to OUT/replays. HanBot's step profile
+goes to OUT/games/<game_id>, so parallel games never write the same file; the
+map static data cache is shared, its files are replaced atomically.
+Games already in results.jsonl are skipped, so an interrupted batch picks up where
+it stopped.
+
+`--backend stand-in` replaces StarCraft II with a stand-in that makes up a result
+and step times after a short sleep, to test the scheduling without the game.
+
+    python scripts/batch_runner.py --out batch/ --games 200 --workers 4
+    python scripts/batch_runner.py --out /tmp/batch --backend stand-in --games 50 --maps A B
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from os import makedirs, path
+from pathlib import Path
+
+ROOT_DIRECTORY = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2/src/ares"))
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2/src"))
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2"))
+
+import numpy as np
+import yaml
+
+from bot.map_index import MapIndex
+
+CONFIG_FILE: str = path.join(ROOT_DIRECTORY, "config.yml")
+BATCH_GAMES: str = "BatchGames"
+RESULTS_FILE: str = "results.jsonl"
+REPLAY_DIRECTORY: str = "replays"
+# Per-game directory for step profiles, one subdirectory per player
+GAME_DIRECTORY: str = "games"
+# Used for settings missing from the config section
+DEFAULT_BATCH: dict = {
+    "Bot": "HanBot",
+    "BotRace": "Terran",
+    "Maps": [],
+    "Opponents": ["RandomBot"],
+    "Races": ["Terran", "Zerg", "Protoss"],
+    "GamesPerMatchup": 1,
+    "Workers": 2,
+    "GameTimeLimit": 1800,
+    "MapPool": {},
+}
+
+
+def load_batch_config() -> dict:
+    batch = dict(DEFAULT_BATCH)
+    if path.isfile(CONFIG_FILE):
+        with open(CONFIG_FILE) as config_file:
+            config = yaml.safe_load(config_file) or {}
+        batch.update(config.get(BATCH_GAMES) or {})
+        batch["MapPool"] = config.get("MapPool") or {}
+    return batch
+
+
+def game_specs(batch: dict, map_index: MapIndex, maps: list[str], games: int, seed: int) -> list[dict]:
+    """
+    The games to play: the matchup matrix repeated `GamesPerMatchup` times or,
+    when `games` is given, that many games cycling through opponents and races on
+    `maps` drawn from the weighted `MapPool`. Maps need not be in the index, those
+    are loaded by name.
+    """
+    if games:
+        weights = [batch["MapPool"].get(name, 1.0) for name in maps]
+        if not any(weight > 0 for weight in weights):
+            raise ValueError(f"every map of {maps} has weight 0 in MapPool")
+        drawn = random.Random(seed).choices(maps, weights=weights, k=games)
+        pairs = list(product(batch["Opponents"], batch["Races"]))
+        matchups = [(map_name, *pairs[index % len(pairs)]) for index, map_name in enumerate(drawn)]
+    else:
+        matchups = list(product(maps, batch["Opponents"], batch["Races"])) * batch["GamesPerMatchup"]
+    specs = []
+    for index, (map_name, opponent, race) in enumerate(matchups):
+        specs.append(
+            {
+                "game_id": f"{index:05d}-{map_name}-{opponent.replace(':', '')}-{race}",
+                "map": map_name,
+                "map_path": map_index.maps[map_name]["path"] if map_name in map_index.maps else None,
+                "bot": batch["Bot"],
+                "bot_race": batch["BotRace"],
+                "opponent": opponent,
+                "race": race,
+                "game_time_limit": batch["GameTimeLimit"],
+            }
+        )
+    return specs
+
+
+def step_stats(step_ms) -> dict:
+    step_ms = np.asarray(step_ms, dtype=np.float64)
+    if not len(step_ms):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(step_ms, [50, 95, 99])
+    return {
+        "count": int(len(step_ms)),
+        "mean": float(step_ms.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "max": float(step_ms.max()),
+    }
+
+
+def create_bot(name: str, bot_directory: str):
+    """
+    Args:
+        name: Bot class to create, by its config name
+        bot_directory: Where the bot writes its step profile
+    """
+    if name == "HanBot":
+        from bot.han import HanBot
+
+        return HanBot(step_profile_path=path.join(bot_directory, "step_profile.npz"))
+    if name == "QinBot":
+        from bot.qin import QinBot
+
+        return QinBot()
+    if name == "RandomBot":
+        from bot.random import MyBot
+
+        return MyBot()
+    raise ValueError(f"Unknown bot {name}")
+
+
+def time_steps(bot) -> list[float]:
+    """Record the wall time of every `on_step` of `bot` into the returned list, in ms."""
+    timings: list[float] = []
+    on_step = bot.on_step
+
+    async def timed_on_step(iteration):
+        start = time.perf_counter()
+        try:
+            await on_step(iteration)
+        finally:
+            timings.append((time.perf_counter() - start) * 1000.0)
+
+    bot.on_step = timed_on_step
+    return timings
+
+
+def play_sc2(spec: dict, replay_path: str, game_directory: str) -> dict:
+    from sc2 import maps
+    from sc2.data import Difficulty, Race
+    from sc2.main import run_game
+    from sc2.player import Bot, Computer
+
+    bot = create_bot(spec["bot"], path.join(game_directory, "bot"))
+    timings = time_steps(bot)
+    race = Race[spec["race"]]
+    if spec["opponent"].startswith("Computer"):
+        _, _, difficulty = spec["opponent"].partition(":")
+        opponent = Computer(race, Difficulty[difficulty or "Hard"])
+    else:
+        opponent = Bot(race, create_bot(spec["opponent"], path.join(game_directory, "opponent")), spec["opponent"])
+    result = run_game(
+        maps.Map(Path(spec["map_path"])) if spec["map_path"] else maps.get(spec["map"]),
+        [Bot(Race[spec["bot_race"]], bot, spec["bot"]), opponent],
+        realtime=False,
+        save_replay_as=replay_path,
+        game_time_limit=spec["game_time_limit"],
+    )
+    if isinstance(result, list):
+        result = result[0]
+    return {
+        "result": getattr(result, "name", str(result)),
+        "game_time": float(bot.time) if getattr(bot, "state", None) is not None else 0.0,
+        "step_ms": step_stats(timings),
+    }
+
+
+def play_stand_in(spec: dict, replay_path: str, delay: float) -> dict:
+    """Made-up but reproducible outcome for `spec`, after sleeping about `delay` seconds."""
+    rng = random.Random(zlib.crc32(spec["game_id"].encode()))
+    time.sleep(delay * rng.uniform(0.5, 1.5))
+    steps = rng.randint(2000, 12000)
+    timings = np.random.default_rng(rng.getrandbits(32)).gamma(2.0, 4.0, steps)
+    Path(replay_path).write_bytes(b"")
+    return {
+        "result": rng.choice(["Victory", "Defeat", "Tie"]),
+        "game_time": steps * 2 / 22.4,
+        "step_ms": step_stats(timings),
+    }
+
+
+def play_game(spec: dict, out_directory: str, backend: str, stand_in_delay: float) -> dict:
+    """Worker entry point: play one game, never raises."""
+    replay_path = path.join(out_directory, REPLAY_DIRECTORY, f"{spec['game_id']}.SC2Replay")
+    game_directory = path.join(out_directory, GAME_DIRECTORY, spec["game_id"])
+    start = time.perf_counter()
+    record = dict(spec)
+    try:
+        if backend == "sc2":
+            record.update(play_sc2(spec, replay_path, game_directory))
+        else:
+            record.update(play_stand_in(spec, replay_path, stand_in_delay))
+        record["replay"] = replay_path if path.isfile(replay_path) else None
+    except Exception as e:
+        record.update(result="Error", error=f"{type(e).__name__}: {e}")
+    record["wall_time"] = time.perf_counter() - start
+    return record
+
+
+def finished_games(results_path: str) -> set[str]:
+    if not path.isfile(results_path):
+        return set()
+    with open(results_path) as results_file:
+        return {json.loads(line)["game_id"] for line in results_file if line.strip()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="Directory for results.jsonl and replays")
+    parser.add_argument("--games", type=int, default=None, help="Games to play, default the whole matrix")
+    parser.add_argument("--workers", type=int, default=None, help="Default from config")
+    parser.add_argument("--maps", nargs="+", default=None, help="Default from config, else every map")
+    parser.add_argument("--maps-path", default=None, help="Maps directory, default SC2_MAPS_PATH or the install's")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the map draws with --games")
+    parser.add_argument("--backend", choices=["sc2", "stand-in"], default="sc2")
+    parser.add_argument("--stand-in-delay", type=float, default=0.05, help="Seconds per stand-in game")
+    args = parser.parse_args()
+
+    batch = load_batch_config()
+    # the index is only rebuilt when the maps directory changed, so this is instant
+    map_index = MapIndex(args.maps_path)
+    maps = args.maps or batch["Maps"] or map_index.names()
+    if not maps:
+        searched = map_index.directory or "python-sc2's maps directory (no StarCraft II install found)"
+        parser.error(f"no maps found in {searched}, pass --maps or set {BATCH_GAMES}.Maps in config.yml")
+    try:
+        specs = game_specs(batch, map_index, maps, args.games, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    makedirs(path.join(args.out, REPLAY_DIRECTORY), exist_ok=True)
+    results_path = path.join(args.out, RESULTS_FILE)
+    done = finished_games(results_path)
+    pending = [spec for spec in specs if spec["game_id"] not in done]
+    print(f"{len(specs)} games, {len(specs) - len(pending)} already played, {len(pending)} to play")
+
+    counts: dict[str, int] = {}
+    start = time.perf_counter()
+    workers = args.workers or batch["Workers"]
+    # a fresh process per game, bots and python-sc2 keep module level state
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool, open(
+        results_path, "a"
+    ) as results_file:
+        futures = [
+            pool.submit(play_game, spec, args.out, args.backend, args.stand_in_delay) for spec in pending
+        ]
+        for finished, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            results_file.write(json.dumps(record) + "\n")
+            results_file.flush()
+            counts[record["result"]] = counts.get(record["result"], 0) + 1
+            print(
+                f"[{finished}/{len(pending)}] {record['game_id']}: {record['result']} "
+                f"step p95 {record.get('step_ms', {}).get('p95', float('nan')):.1f} ms"
+            )
+
+    summary = ", ".join(f"{result} {count}" for result, count in sorted(counts.items()))
+    print(f"played {sum(counts.values())} games in {time.perf_counter() - start:.1f} s: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Times each bot's combat code on synthetic battles of growing size.
+
+Armies are added to an observation from a recording (see scripts/replay_benchmark.py),
+half way between the two start locations, and fed through the step-replay harness.
+Only the combat entry point is timed: HanBot.execute_attack, QinBot._micro and
+MyBot._micro.
+
+    python scripts/battle_benchmark.py data/game.sc2steps --bots han qin --sizes 25 50 100 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+from os import path
+
+ROOT_DIRECTORY = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2/src/ares"))
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2/src"))
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2"))
+
+import numpy as np
+from sc2.data import Race
+from sc2.game_state import GameState
+from sc2.ids.unit_typeid import UnitTypeId
+
+from bot.battle_fixtures import DEFAULT_COMPOSITIONS, battle_observation
+from bot.step_replay import open_recording, start_bot
+
+HAN_MILITARY_TYPES = {UnitTypeId.MARINE, UnitTypeId.MARAUDER}
+HAN_TANK_TYPES = {UnitTypeId.SIEGETANK, UnitTypeId.SIEGETANKSIEGED}
+
+
+class HanDriver:
+    def create(self):
+        from bot.han import HanBot
+
+        return HanBot()
+
+    async def prepare(self, bot, iteration):
+        bot.step_cache.clear()
+        bot.build_spatial_indices()
+
+    async def run(self, bot):
+        await bot.execute_attack(bot.units.of_type(HAN_MILITARY_TYPES), bot.units.of_type(HAN_TANK_TYPES))
+
+
+class AresDriver:
+    def __init__(self, name):
+        self.name = name
+
+    def create(self):
+        if self.name == "qin":
+            from bot.qin import QinBot
+
+            return QinBot()
+        from bot.random import MyBot
+
+        return MyBot()
+
+    async def prepare(self, bot, iteration):
+        from ares import AresBot
+
+        # Updates ares' managers (unit roles, grids, unit trees) without the bot's own macro
+        await AresBot.on_step(bot, iteration)
+
+    async def run(self, bot):
+        from ares.consts import UnitRole
+
+        bot._micro(bot.mediator.get_units_from_role(role=UnitRole.ATTACKING))
+
+
+DRIVERS = {"han": HanDriver(), "qin": AresDriver("qin"), "random": AresDriver("random")}
+
+
+def parse_composition(text):
+    """MARINE:0.6,MARAUDER:0.4 -> {UnitTypeId.MARINE: 0.6, UnitTypeId.MARAUDER: 0.4}"""
+    composition = {}
+    for item in text.split(","):
+        name, share = item.split(":")
+        composition[UnitTypeId[name.strip().upper()]] = float(share)
+    return composition
+
+
+async def time_battle(driver, recording, step, army_size, repeats, own_composition, enemy_composition, spread, seed):
+    header, client, steps = open_recording(recording)
+    base = next(steps)
+    for _ in range(step):
+        base = next(steps, base)
+    bot = driver.create()
+    await start_bot(bot, header, client, base)
+
+    start, enemy_start = np.array(bot.start_location), np.array(bot.enemy_start_locations[0])
+    playable = bot.game_info.playable_area
+    bounds = (playable.x, playable.y, playable.right, playable.top)
+    observation = battle_observation(
+        base,
+        own_composition or DEFAULT_COMPOSITIONS[bot.race],
+        enemy_composition or DEFAULT_COMPOSITIONS.get(bot.enemy_race, DEFAULT_COMPOSITIONS[Race.Zerg]),
+        army_size,
+        start + 0.45 * (enemy_start - start),
+        start + 0.55 * (enemy_start - start),
+        header["player_id"],
+        bounds,
+        spread=spread,
+        seed=seed,
+    )
+    client.set_observation(observation)
+
+    timings = []
+    for iteration in range(repeats):
+        # Every repeat is a new frame, python-sc2 caches some properties per game loop
+        observation.observation.game_loop += client.game_step
+        bot._prepare_step(GameState(observation), client.game_info_response)
+        await bot.issue_events()
+        await driver.prepare(bot, iteration)
+        start_time = time.perf_counter()
+        await driver.run(bot)
+        timings.append((time.perf_counter() - start_time) * 1000.0)
+        bot.actions.clear()
+        bot.unit_tags_received_action.clear()
+    return np.array(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="File written by StepRecorder")
+    parser.add_argument("--bots", nargs="+", choices=list(DRIVERS), default=["han"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 25, 50, 100, 200], help="Units per side")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed iterations per size")
+    parser.add_argument("--step", type=int, default=0, help="Recorded step to add the armies to")
+    parser.add_argument("--own", type=parse_composition, default=None, help="e.g. MARINE:0.6,MARAUDER:0.4")
+    parser.add_argument("--enemy", type=parse_composition, default=None, help="e.g. ZERGLING:0.5,ROACH:0.5")
+    parser.add_argument("--spread", type=float, default=6.0, help="Std. deviation of unit positions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Write the scaling curves to this .npz file")
+    args = parser.parse_args()
+
+    curves = {}
+    for name in args.bots:
+        p50 = []
+        for size in args.sizes:
+            timings = asyncio.run(
+                time_battle(
+                    DRIVERS[name],
+                    args.recording,
+                    args.step,
+                    size,
+                    args.repeats,
+                    args.own,
+                    args.enemy,
+                    args.spread,
+                    args.seed,
+                )
+            )
+            p50.append(np.percentile(timings, 50))
+            print(
+                f"{name:<8} {size:>4} vs {size:<4} p50 {p50[-1]:8.2f}ms  "
+                f"p95 {np.percentile(timings, 95):8.2f}ms  max {timings.max():8.2f}ms"
+            )
+        curves[name] = np.array(p50)
+
+    if args.out:
+        np.savez_compressed(args.out, sizes=np.array(args.sizes), **curves)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Checks and times the shared flow fields of QinBot and MyBot on a synthetic ground grid.
+
+The grid has the size of a ladder map, scattered blocked cells and a blocked
+5x5 enemy townhall as the attack target, like ares' ground grid. The script
+fails when the townhall gives no route, then times a field built from scratch
+and one reusing the lattice, and walks an idle army to the target while an
+influence blob moves across the map, reporting field builds and re-plans.
+
+    python scripts/flow_field_benchmark.py --loops 1200 --units 20
+"""
+import argparse
+import sys
+import time
+from os import path
+
+ROOT_DIRECTORY = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+
+import numpy as np
+from sc2.position import Point2
+
+from bot.flow_field import FLOW_FIELD_ARRIVAL_DISTANCE, FlowField, RouteCache
+from bot.grid_tracker import GridTracker
+
+GRID_SIZE = (200, 176)
+START = Point2((10.5, 10.5))
+TOWNHALL = Point2((185.5, 165.5))
+
+
+def synthetic_grid(seed):
+    """Ground grid indexed [x, y]: 1 where walkable, np.inf on scattered cells and the townhall."""
+    grid = np.ones(GRID_SIZE)
+    grid[np.random.default_rng(seed).random(GRID_SIZE) < 0.1] = np.inf
+    grid[5:16, 5:16] = 1
+    grid[170:195, 150:175] = 1
+    x, y = int(TOWNHALL[0]), int(TOWNHALL[1])
+    grid[x - 2 : x + 3, y - 2 : y + 3] = np.inf
+    return grid
+
+
+def walk(grid, loops, unit_count, speed=0.6):
+    """Move `unit_count` units to the townhall along their waypoints, one step every 2 loops."""
+    tracker = GridTracker()
+    routes = RouteCache(tracker)
+    positions = {tag: np.array([START[0] + tag % 5, START[1] + tag // 5]) for tag in range(unit_count)}
+    lost = 0
+    start_time = time.perf_counter()
+    for game_loop in range(0, loops, 2):
+        step_grid = grid.copy()
+        # enemy influence passing through the middle of the map
+        x, y = (game_loop // 2) % 150 + 20, 100
+        blob = step_grid[x - 5 : x + 5, y - 5 : y + 5]
+        blob[np.isfinite(blob)] = 5.0
+        tracker.update(step_grid, game_loop)
+        for tag, position in list(positions.items()):
+            waypoint = routes.waypoint(tag, Point2(position), step_grid, TOWNHALL)
+            if waypoint is None:
+                lost += 1
+                continue
+            delta = np.array(waypoint) - position
+            distance = float(np.hypot(*delta))
+            if distance > 0:
+                position += delta / distance * min(distance, speed)
+            if TOWNHALL.distance_to_point2(Point2(position)) < FLOW_FIELD_ARRIVAL_DISTANCE:
+                del positions[tag]
+                routes.release(tag)
+    elapsed = time.perf_counter() - start_time
+    return unit_count - len(positions), lost, routes.fields.builds, routes.replans, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loops", type=int, default=1200, help="Game loops to walk for")
+    parser.add_argument("--units", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    grid = synthetic_grid(args.seed)
+    start_time = time.perf_counter()
+    field = FlowField(grid, TOWNHALL)
+    fresh_ms = (time.perf_counter() - start_time) * 1000.0
+    if field.route(START) is None:
+        sys.exit(f"no route from {START} to the townhall at {TOWNHALL}")
+    start_time = time.perf_counter()
+    FlowField(grid, TOWNHALL, lattice=field.lattice)
+    reused_ms = (time.perf_counter() - start_time) * 1000.0
+    print(f"townhall target searched from cell {field.goal}")
+    print(f"field build {fresh_ms:.1f} ms, {reused_ms:.1f} ms reusing the lattice")
+
+    arrived, lost, builds, replans, elapsed = walk(grid, args.loops, args.units)
+    print(
+        f"{arrived}/{args.units} units arrived in {args.loops} loops: {builds} field builds, "
+        f"{replans} re-plans, {lost} steps without a waypoint, {elapsed:.2f} s"
+    )
+    if arrived < args.units:
+        sys.exit("not every unit reached the townhall")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Local stand-in for the game's websocket API, to exercise the ladder connection.
+
+Serves `ws://HOST:PORT/sc2api` and answers every request with an empty response
+of the same kind (status in_game), optionally after a simulated delay. Game steps
+advance a game loop that observations report back.
+
+    python scripts/mock_sc2api.py --port 5677               # serve until interrupted
+    python scripts/mock_sc2api.py --probe 1000 --delay 0.5  # serve, connect through
+                                                            # ladder.LadderConnection,
+                                                            # play steps, print timings
+
+`--trace PATH` writes a protocol trace of the probe for scripts/protocol_report.py.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from os import path
+
+ROOT_DIRECTORY = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2/src/ares"))
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2/src"))
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2"))
+
+from aiohttp import WSMsgType, web
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+IN_GAME: int = 3  # sc_pb.Status.in_game
+
+
+def respond(request: sc_pb.Request, state: dict) -> sc_pb.Response:
+    response = sc_pb.Response(id=request.id, status=IN_GAME)
+    kind = request.WhichOneof("request")
+    if kind == "step":
+        state["game_loop"] += max(request.step.count, 1)
+        response.step.simulation_loop = state["game_loop"]
+    elif kind == "observation":
+        response.observation.observation.game_loop = state["game_loop"]
+    elif kind == "ping":
+        response.ping.game_version = "mock"
+        response.ping.data_version = "mock"
+        response.ping.base_build = 0
+    elif kind is not None:
+        getattr(response, kind).SetInParent()
+    return response
+
+
+def make_app(delay: float) -> web.Application:
+    """
+    Args:
+        delay: Seconds to wait before answering each request
+    """
+
+    async def sc2api(http_request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(http_request)
+        state = {"game_loop": 0}
+        async for message in ws:
+            if message.type != WSMsgType.BINARY:
+                continue
+            request = sc_pb.Request()
+            request.ParseFromString(message.data)
+            if delay:
+                await asyncio.sleep(delay)
+            await ws.send_bytes(respond(request, state).SerializeToString())
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/sc2api", sc2api)
+    return app
+
+
+async def serve(host: str, port: int, delay: float) -> web.AppRunner:
+    runner = web.AppRunner(make_app(delay))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def probe(host: str, port: int, delay: float, steps: int, compute: float, heartbeat, trace) -> None:
+    """Play `steps` game steps the way `sc2.main._play_game_ai` does, busy for `compute` s each."""
+    from ladder import LadderConnection
+
+    runner = await serve(host, port, delay)
+    try:
+        async with LadderConnection(host, port, heartbeat=heartbeat, trace_path=trace) as connection:
+            client = connection.client
+            await client.ping()
+            for _ in range(steps):
+                await client._execute(observation=sc_pb.RequestObservation())
+                busy_until = time.perf_counter() + compute
+                while time.perf_counter() < busy_until:
+                    pass
+                await client._execute(action=sc_pb.RequestAction())
+                await client._execute(step=sc_pb.RequestStep(count=1))
+            print(connection.summary())
+        print(f"session closed: {connection.session.closed}")
+    finally:
+        await runner.cleanup()
+
+
+async def serve_forever(host: str, port: int, delay: float) -> None:
+    runner = await serve(host, port, delay)
+    print(f"serving ws://{host}:{port}/sc2api")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5677)
+    parser.add_argument("--delay", type=float, default=0.0, help="Simulated response delay in ms")
+    parser.add_argument("--probe", type=int, metavar="STEPS", help="Connect, play this many steps, then exit")
+    parser.add_argument("--compute", type=float, default=1.0, help="Simulated bot compute per probe step in ms")
+    parser.add_argument("--heartbeat", type=float, help="Websocket heartbeat of the probe in seconds")
+    parser.add_argument("--trace", help="Protocol trace file of the probe")
+    args = parser.parse_args()
+
+    delay = args.delay / 1000.0
+    if args.probe:
+        asyncio.run(
+            probe(args.host, args.port, delay, args.probe, args.compute / 1000.0, args.heartbeat, args.trace)
+        )
+    else:
+        try:
+            asyncio.run(serve_forever(args.host, args.port, delay))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Offline report for a protocol trace written by `bot.protocol_trace`.
+
+Splits the traced wall time into waiting on the game (request round trips),
+protocol CPU (serializing requests, parsing responses) and bot compute (the time
+between requests), overall and per game step, and breaks the requests down by kind.
+
+    python scripts/protocol_report.py trace.bin
+"""
+import argparse
+import sys
+from os import path
+
+ROOT_DIRECTORY = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+
+import numpy as np
+
+from bot.protocol_trace import REQUEST_KINDS, REQUEST_NAMES, read_trace
+
+
+def split_time(records: np.ndarray) -> dict:
+    """Total wall, I/O, protocol CPU and compute seconds over `records`."""
+    ends = records["start"] + records["serialize"] + records["round_trip"] + records["parse"]
+    wall = float(ends[-1] - records["start"][0])
+    io = float(records["round_trip"].sum(dtype=np.float64))
+    protocol = float(records["serialize"].sum(dtype=np.float64) + records["parse"].sum(dtype=np.float64))
+    return {"wall": wall, "io": io, "protocol": protocol, "compute": wall - io - protocol}
+
+
+def step_times(records: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Per game step wall, I/O, protocol CPU and compute milliseconds.
+
+    A step runs from the end of one step request to the end of the next.
+    """
+    ends = records["start"] + records["serialize"] + records["round_trip"] + records["parse"]
+    step_ends = np.flatnonzero(records["kind"] == REQUEST_KINDS["step"])
+    columns = {"wall": [], "io": [], "protocol": [], "compute": []}
+    for first, last in zip(step_ends[:-1], step_ends[1:]):
+        step = records[first + 1 : last + 1]
+        io = step["round_trip"].sum(dtype=np.float64)
+        protocol = step["serialize"].sum(dtype=np.float64) + step["parse"].sum(dtype=np.float64)
+        wall = ends[last] - ends[first]
+        columns["wall"].append(wall)
+        columns["io"].append(io)
+        columns["protocol"].append(protocol)
+        columns["compute"].append(wall - io - protocol)
+    return {name: np.array(values) * 1000.0 for name, values in columns.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace")
+    args = parser.parse_args()
+
+    records = read_trace(args.trace)
+    if not len(records):
+        print("empty trace")
+        return
+
+    total = split_time(records)
+    print(f"{len(records)} requests over {total['wall']:.2f} s")
+    for name in ("io", "protocol", "compute"):
+        print(f"  {name:<9} {total[name]:9.3f} s  {100 * total[name] / total['wall']:5.1f}%")
+
+    steps = step_times(records)
+    if len(steps["wall"]):
+        print(f"\n{len(steps['wall'])} steps, ms        mean      p50      p95      max")
+        for name, values in steps.items():
+            p50, p95 = np.percentile(values, [50, 95])
+            print(f"  {name:<18} {values.mean():8.3f} {p50:8.3f} {p95:8.3f} {values.max():8.3f}")
+
+    print(
+        f"\n{'request':<14} {'count':>7} {'rtt ms':>8} {'p95':>8} {'ser ms':>8} "
+        f"{'parse ms':>8} {'req B':>9} {'resp B':>10}"
+    )
+    for kind in np.unique(records["kind"]):
+        of_kind = records[records["kind"] == kind]
+        round_trips = of_kind["round_trip"] * 1000.0
+        print(
+            f"{REQUEST_NAMES.get(int(kind), '?'):<14} {len(of_kind):>7} "
+            f"{round_trips.mean():8.3f} {np.percentile(round_trips, 95):8.3f} "
+            f"{of_kind['serialize'].mean() * 1000.0:8.3f} {of_kind['parse'].mean() * 1000.0:8.3f} "
+            f"{of_kind['request_bytes'].mean():9.0f} {of_kind['response_bytes'].mean():10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Replays a recorded game into a bot without StarCraft II and reports step cost.
+
+Record a game of the first player in run.py, whichever bot that is, with
+`python run.py --record data/game.sc2steps`, then:
+
+    python scripts/replay_benchmark.py data/game.sc2steps --bot han --out data/han_replay.npz
+"""
+import argparse
+import asyncio
+import sys
+from os import path
+
+ROOT_DIRECTORY = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2/src/ares"))
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2/src"))
+sys.path.append(path.join(ROOT_DIRECTORY, "ares-sc2"))
+
+import numpy as np
+
+from bot.step_replay import replay
+
+BOTS = ["han", "qin", "random"]
+
+
+def create_bot(name):
+    # QinBot and MyBot need ares, so only import the bot being benchmarked
+    if name == "han":
+        from bot.han import HanBot
+
+        # a benchmark run must not overwrite the profile of the last real game
+        return HanBot(step_profile_path=None)
+    if name == "qin":
+        from bot.qin import QinBot
+
+        return QinBot()
+    from bot.random import MyBot
+
+    return MyBot()
+
+
+def summarize(results):
+    lines = []
+    for column in ("step_ms", "actions", "gc_collections", "alloc_peak_kb", "alloc_net_kb"):
+        if column not in results or not len(results[column]):
+            continue
+        values = results[column]
+        p50, p95 = np.percentile(values, [50, 95])
+        lines.append(
+            f"{column:<16} mean {values.mean():9.2f}  p50 {p50:9.2f}  p95 {p95:9.2f}  max {values.max():9.2f}"
+        )
+    lines.append(f"requests         {results['requests']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="File written by StepRecorder")
+    parser.add_argument("--bot", choices=BOTS, default="han")
+    parser.add_argument("--max-steps", type=int, default=None)
+    parser.add_argument("--no-alloc", action="store_true", help="Skip tracemalloc, for undistorted timings")
+    parser.add_argument("--out", default=None, help="Write per-iteration stats to this .npz file")
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        replay(
+            create_bot(args.bot),
+            args.recording,
+            trace_allocations=not args.no_alloc,
+            max_steps=args.max_steps,
+        )
+    )
+    print(summarize(results))
+    if args.out:
+        np.savez_compressed(args.out, **{k: v for k, v in results.items() if k != "requests"})
+
+
+if __name__ == "__main__":
+    main()